@@ -40,6 +40,8 @@ class DatabaseMapping(
     :param str db_url: A database URL in RFC-1738 format pointing to the database to be mapped.
     :param str username: A user name. If ``None``, it gets replaced by the string ``"anon"``.
     :param bool upgrade: Whether or not the db at the given URL should be upgraded to the most recent version.
+    :ivar bool auto_flush: Whether inserts are executed right away (the default) or buffered until
+        :meth:`flush_pending` or commit, see :class:`.DatabaseMappingAddMixin`.
     """
 
     def __init__(self, *args, **kwargs):
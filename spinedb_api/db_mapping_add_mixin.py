@@ -17,14 +17,22 @@
 # TODO: improve docstrings
 
 from datetime import datetime
+from itertools import chain
 from sqlalchemy import func, Table, Column, Integer, String, null, select
 from sqlalchemy.exc import DBAPIError
-from .exception import SpineDBAPIError
+from .exception import SpineIntegrityError
 from .helpers import get_relationship_entity_class_items, get_relationship_entity_items
 
 
 class DatabaseMappingAddMixin:
-    """Provides methods to perform ``INSERT`` operations over a Spine db."""
+    """Provides methods to perform ``INSERT`` operations over a Spine db.
+
+    Inserts are executed right away by default. Setting the ``auto_flush`` attribute to ``False`` buffers them
+    until :meth:`flush_pending` is called or the session is committed. Buffered rows are not visible to queries
+    and skip the database's uniqueness checks until flushed, so checks against them must go through a cache
+    passed to :meth:`add_items`. Integrity checks that build their own cache, single item methods such as
+    :meth:`add_object_class`, updates and removals flush the buffer first.
+    """
 
     def __init__(self, *args, **kwargs):
         """Initialize class."""
@@ -59,23 +67,68 @@ class DatabaseMappingAddMixin:
             except DBAPIError:
                 # Some other concurrent process must have beaten us to create the table
                 self._next_id = Table("next_id", self._metadata, autoload=True)
+        self.auto_flush = True
+        self._pending_inserts = {}
+        self._known_next_ids = {}
+        self._insert_statements = {}
+        self._compiled_inserts = {}
 
-    def _add_commit_id_and_ids(self, tablename, *items):
+    def _add_commit_id_and_ids(self, tablename, items):
         if not items:
             return [], set()
-        ids = self._reserve_ids(tablename, len(items))
+        items_without_id = [item for item in items if item.get("id") is None]
+        if len(items_without_id) == len(items):
+            ids = self._reserve_ids(tablename, len(items))
+        else:
+            # Some items come with ids already (e.g. when replaying changes); keep next_id ahead of them.
+            supplied_ids = {item["id"] for item in items if item.get("id") is not None}
+            self._check_supplied_ids(tablename, supplied_ids)
+            min_next_id = max(supplied_ids) + 1
+            if items_without_id or min_next_id > self._known_next_ids.get(tablename, 0):
+                ids = self._reserve_ids(tablename, len(items_without_id), min_next_id)
+            else:
+                ids = ()
         commit_id = self._make_commit_id()
-        for id_, item in zip(ids, items):
+        for item in items:
             item["commit_id"] = commit_id
+        for id_, item in zip(ids, items_without_id):
             item["id"] = id_
 
-    def _reserve_ids(self, tablename, count):
+    def _check_supplied_ids(self, tablename, ids):
+        """Raises if any of given ids is already in use.
+
+        Args:
+            tablename (str): target database table name
+            ids (set of int): ids supplied with the items to add
+
+        Raises:
+            SpineIntegrityError: if an id is taken
+        """
+        id_tablename = {
+            "object_class": "entity_class",
+            "relationship_class": "entity_class",
+            "object": "entity",
+            "relationship": "entity",
+        }.get(tablename, tablename)
+        taken_ids = {row["id"] for row in self._pending_inserts.get(id_tablename, ()) if row["id"] in ids}
+        for table in {self._metadata.tables[id_tablename], self._get_table_for_insert(id_tablename)}:
+            taken_ids.update(x.id for x in self.query(table.c.id).filter(self.in_(table.c.id, ids)))
+        if taken_ids:
+            raise SpineIntegrityError(
+                f"Can't add {tablename} items: id(s) {', '.join(str(id_) for id_ in sorted(taken_ids))} already in use."
+            )
+
+    def _reserve_ids(self, tablename, count, min_next_id=None):
         if self.committing:
-            return self._do_reserve_ids(self.connection, tablename, count)
-        with self.engine.begin() as connection:
-            return self._do_reserve_ids(connection, tablename, count)
+            ids = self._do_reserve_ids(self.connection, tablename, count, min_next_id)
+        else:
+            with self.engine.begin() as connection:
+                ids = self._do_reserve_ids(connection, tablename, count, min_next_id)
+        # The stored next_id only ever grows, so the last one we've seen is a safe lower bound for it.
+        self._known_next_ids[tablename] = ids.stop
+        return ids
 
-    def _do_reserve_ids(self, connection, tablename, count):
+    def _do_reserve_ids(self, connection, tablename, count, min_next_id=None):
         fieldname = {
             "object_class": "entity_class_id",
             "object": "entity_id",
@@ -111,6 +164,8 @@ class DatabaseMappingAddMixin:
             select_max_id = select([func.max(getattr(table.c, id_col))])
             max_id = connection.execute(select_max_id).scalar()
             next_id = max_id + 1 if max_id else 1
+        if min_next_id is not None and next_id < min_next_id:
+            next_id = min_next_id
         new_next_id = next_id + count
         connection.execute(stmt, {"user": self.username, "date": datetime.utcnow(), fieldname: new_next_id})
         return range(next_id, new_next_id)
@@ -118,7 +173,7 @@ class DatabaseMappingAddMixin:
     def _readd_items(self, tablename, *items):
         """Add known items to database."""
         self._make_commit_id()
-        for _ in self._do_add_items(tablename, *items):
+        for _ in self._do_add_items(tablename, items):
             pass
 
     def add_items(
@@ -163,7 +218,7 @@ class DatabaseMappingAddMixin:
         if return_items:
             return checked_items, intgr_error_log
         if return_dups:
-            ids.update(set(x.id for x in intgr_error_log if x.id))
+            ids.update({x.id for x in intgr_error_log if x.id})
         return ids, intgr_error_log
 
     def _add_items(self, tablename, *items):
@@ -178,8 +233,8 @@ class DatabaseMappingAddMixin:
         Returns:
             ids (set): added instances' ids
         """
-        self._add_commit_id_and_ids(tablename, *items)
-        for _ in self._do_add_items(tablename, *items):
+        self._add_commit_id_and_ids(tablename, items)
+        for _ in self._do_add_items(tablename, items):
             pass
         return {item["id"] for item in items}
 
@@ -197,18 +252,56 @@ class DatabaseMappingAddMixin:
         """
         return self._metadata.tables[tablename]
 
-    def _do_add_items(self, tablename, *items_to_add):
+    def _insert_rows(self, table, rows):
+        """Inserts rows into given table.
+
+        The insert statement is created once per table and its compiled form is cached,
+        so repeated adds don't recompile it.
+
+        Args:
+            table (Table): table to insert into
+            rows (list of dict): rows to insert
+        """
+        if not rows:
+            return
+        statement = self._insert_statements.get(table)
+        if statement is None:
+            statement = self._insert_statements[table] = table.insert()
+        # SQLAlchemy 1.3 accepts a compiled cache only as a connection option
+        self.connection.execution_options(compiled_cache=self._compiled_inserts).execute(statement, rows)
+
+    def _do_add_items(self, tablename, items_to_add):
         if not self.committing:
             return
-        items_to_add = tuple(self._items_with_type_id(tablename, *items_to_add))
-        try:
+        with self._reraise_dbapi_error(f"inserting {tablename} items"):
             for tablename_, items_to_add_ in self._items_to_add_per_table(tablename, items_to_add):
                 table = self._get_table_for_insert(tablename_)
-                self._checked_execute(table.insert(), [{**item} for item in items_to_add_])
+                if self.auto_flush:
+                    # Only cache items need converting, plain dicts such as the subtype rows can go in as they are
+                    rows = [item if type(item) is dict else {**item} for item in items_to_add_]
+                    self._insert_rows(table, rows)
+                else:
+                    # Buffered rows are copied so that later changes to the items don't leak into the insert
+                    self._pending_inserts.setdefault(tablename_, []).extend({**item} for item in items_to_add_)
                 yield tablename_
-        except DBAPIError as e:
-            msg = f"DBAPIError while inserting {tablename} items: {e.orig.args}"
-            raise SpineDBAPIError(msg) from e
+
+    def flush_pending(self):
+        """Inserts the items buffered while ``auto_flush`` was off, issuing one statement per table.
+
+        Buffered items are not visible to queries and skip the database's uniqueness checks until flushed,
+        so checks against them must be done by the caller, e.g., by passing a cache to ``add_items()``.
+        The buffer is flushed automatically on commit.
+        """
+        pending = self._pending_inserts
+        with self._reraise_dbapi_error("inserting pending items"):
+            # Tables are flushed in dependency order so that referenced rows go in before the rows referencing them.
+            # A table's rows are dropped from the buffer only once inserted, so a failure doesn't lose the rest.
+            for tablename in self._tablenames:
+                rows = pending.get(tablename)
+                if rows is None:
+                    continue
+                self._insert_rows(self._get_table_for_insert(tablename), rows)
+                del pending[tablename]
 
     def _items_to_add_per_table(self, tablename, items_to_add):
         """
@@ -222,57 +315,68 @@ class DatabaseMappingAddMixin:
         Yields:
             tuple: database table name, items to add
         """
+        # Entity items get their type_id stamped here rather than in a separate pass in _do_add_items().
         if tablename == "object_class":
-            oc_items_to_add = list()
-            append_oc_items_to_add = oc_items_to_add.append
+            object_class_type = self.object_class_type
             for item in items_to_add:
-                append_oc_items_to_add({"entity_class_id": item["id"], "type_id": self.object_class_type})
+                item["type_id"] = object_class_type
+            oc_items_to_add = [{"entity_class_id": item["id"], "type_id": object_class_type} for item in items_to_add]
             yield ("entity_class", items_to_add)
             yield ("object_class", oc_items_to_add)
         elif tablename == "object":
-            o_items_to_add = list()
-            append_o_items_to_add = o_items_to_add.append
+            object_entity_type = self.object_entity_type
             for item in items_to_add:
-                append_o_items_to_add({"entity_id": item["id"], "type_id": item["type_id"]})
+                item["type_id"] = object_entity_type
+            o_items_to_add = [{"entity_id": item["id"], "type_id": object_entity_type} for item in items_to_add]
             yield ("entity", items_to_add)
             yield ("object", o_items_to_add)
         elif tablename == "relationship_class":
-            rc_items_to_add = list()
-            rec_items_to_add = list()
+            relationship_class_type = self.relationship_class_type
+            object_class_type = self.object_class_type
             for item in items_to_add:
-                rc_items_to_add.append({"entity_class_id": item["id"], "type_id": self.relationship_class_type})
-                rec_items_to_add += get_relationship_entity_class_items(item, self.object_class_type)
+                item["type_id"] = relationship_class_type
+            rc_items_to_add = [
+                {"entity_class_id": item["id"], "type_id": relationship_class_type} for item in items_to_add
+            ]
+            rec_items_to_add = list(
+                chain.from_iterable(
+                    get_relationship_entity_class_items(item, object_class_type) for item in items_to_add
+                )
+            )
             yield ("entity_class", items_to_add)
             yield ("relationship_class", rc_items_to_add)
             yield ("relationship_entity_class", rec_items_to_add)
         elif tablename == "relationship":
-            re_items_to_add = list()
-            r_items_to_add = list()
+            relationship_entity_type = self.relationship_entity_type
+            object_entity_type = self.object_entity_type
             for item in items_to_add:
-                r_items_to_add.append(
-                    {
-                        "entity_id": item["id"],
-                        "entity_class_id": item["class_id"],
-                        "type_id": self.relationship_entity_type,
-                    }
-                )
-                re_items_to_add += get_relationship_entity_items(
-                    item, self.relationship_entity_type, self.object_entity_type
+                item["type_id"] = relationship_entity_type
+            r_items_to_add = [
+                {"entity_id": item["id"], "entity_class_id": item["class_id"], "type_id": relationship_entity_type}
+                for item in items_to_add
+            ]
+            re_items_to_add = list(
+                chain.from_iterable(
+                    get_relationship_entity_items(item, relationship_entity_type, object_entity_type)
+                    for item in items_to_add
                 )
+            )
             yield ("entity", items_to_add)
             yield ("relationship", r_items_to_add)
             yield ("relationship_entity", re_items_to_add)
         elif tablename == "parameter_definition":
+            get = dict.get
             for item in items_to_add:
                 item["entity_class_id"] = (
-                    item.get("object_class_id") or item.get("relationship_class_id") or item.get("entity_class_id")
+                    get(item, "object_class_id") or get(item, "relationship_class_id") or get(item, "entity_class_id")
                 )
             yield ("parameter_definition", items_to_add)
         elif tablename == "parameter_value":
+            get = dict.get
             for item in items_to_add:
-                item["entity_id"] = item.get("object_id") or item.get("relationship_id") or item.get("entity_id")
+                item["entity_id"] = get(item, "object_id") or get(item, "relationship_id") or get(item, "entity_id")
                 item["entity_class_id"] = (
-                    item.get("object_class_id") or item.get("relationship_class_id") or item.get("entity_class_id")
+                    get(item, "object_class_id") or get(item, "relationship_class_id") or get(item, "entity_class_id")
                 )
             yield ("parameter_value", items_to_add)
         else:
@@ -465,6 +569,7 @@ class DatabaseMappingAddMixin:
         """
         sq = self.object_class_sq
         ids, _ = self.add_object_classes(kwargs, strict=True)
+        self.flush_pending()
         return self.query(sq).filter(sq.c.id.in_(ids)).one_or_none()
 
     def add_object(self, **kwargs):
@@ -479,6 +584,7 @@ class DatabaseMappingAddMixin:
         """
         sq = self.object_sq
         ids, _ = self.add_objects(kwargs, strict=True)
+        self.flush_pending()
         return self.query(sq).filter(sq.c.id.in_(ids)).one_or_none()
 
     def add_wide_relationship_class(self, **kwargs):
@@ -493,6 +599,7 @@ class DatabaseMappingAddMixin:
         """
         sq = self.wide_relationship_class_sq
         ids, _ = self.add_wide_relationship_classes(kwargs, strict=True)
+        self.flush_pending()
         return self.query(sq).filter(sq.c.id.in_(ids)).one_or_none()
 
     def add_wide_relationship(self, **kwargs):
@@ -507,6 +614,7 @@ class DatabaseMappingAddMixin:
         """
         sq = self.wide_relationship_sq
         ids, _ = self.add_wide_relationships(kwargs, strict=True)
+        self.flush_pending()
         return self.query(sq).filter(sq.c.id.in_(ids)).one_or_none()
 
     def add_parameter_definition(self, **kwargs):
@@ -521,6 +629,7 @@ class DatabaseMappingAddMixin:
         """
         sq = self.parameter_definition_sq
         ids, _ = self.add_parameter_definitions(kwargs, strict=True)
+        self.flush_pending()
         return self.query(sq).filter(sq.c.id.in_(ids)).one_or_none()
 
     def add_parameter_value(self, **kwargs):
@@ -535,6 +644,7 @@ class DatabaseMappingAddMixin:
         """
         sq = self.parameter_value_sq
         ids, _ = self.add_parameter_values(kwargs, strict=True)
+        self.flush_pending()
         return self.query(sq).filter(sq.c.id.in_(ids)).one_or_none()
 
     def get_or_add_object_class(self, **kwargs):
@@ -547,6 +657,7 @@ class DatabaseMappingAddMixin:
         """
         sq = self.object_class_sq
         ids, _ = self.add_object_classes(kwargs, return_dups=True)
+        self.flush_pending()
         return self.query(sq).filter(sq.c.id.in_(ids)).one_or_none()
 
     def get_or_add_object(self, **kwargs):
@@ -559,6 +670,7 @@ class DatabaseMappingAddMixin:
         """
         sq = self.object_sq
         ids, _ = self.add_objects(kwargs, return_dups=True)
+        self.flush_pending()
         return self.query(sq).filter(sq.c.id.in_(ids)).one_or_none()
 
     def get_or_add_parameter_definition(self, **kwargs):
@@ -571,4 +683,5 @@ class DatabaseMappingAddMixin:
         """
         sq = self.parameter_definition_sq
         ids, _ = self.add_parameter_definitions(kwargs, return_dups=True)
+        self.flush_pending()
         return self.query(sq).filter(sq.c.id.in_(ids)).one_or_none()
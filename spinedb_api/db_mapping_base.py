@@ -27,7 +27,7 @@ from sqlalchemy import create_engine, case, MetaData, Table, Column, false, and_
 from sqlalchemy.sql.expression import label, Alias
 from sqlalchemy.engine.url import make_url, URL
 from sqlalchemy.orm import Session, aliased
-from sqlalchemy.exc import DatabaseError
+from sqlalchemy.exc import DatabaseError, DBAPIError
 from sqlalchemy.event import listen
 from sqlalchemy.pool import NullPool
 from alembic.migration import MigrationContext
@@ -59,6 +59,12 @@ class DatabaseMappingBase:
     """
 
     _session_kwargs = {}
+    _BULK_IMPORT_PRAGMAS = {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "temp_store": "MEMORY",
+        "cache_size": -200000,
+    }
     ITEM_TYPES = (
         "object_class",
         "relationship_class",
@@ -121,6 +127,7 @@ class DatabaseMappingBase:
         self._memory = memory
         self.committing = True
         self._memory_dirty = False
+        self._connection_pragmas = {}
         self._original_engine = self.create_engine(
             self.sa_url, upgrade=upgrade, create=create, sqlite_timeout=sqlite_timeout
         )
@@ -448,6 +455,44 @@ class DatabaseMappingBase:
 
     def reconnect(self):
         self.connection = self.engine.connect()
+        self._execute_pragmas(self._connection_pragmas)
+
+    def _execute_pragmas(self, pragmas):
+        """Sets SQLite pragmas on the connection.
+
+        Args:
+            pragmas (dict): mapping from pragma name to value
+        """
+        for name, value in pragmas.items():
+            self.connection.execute(f"PRAGMA {name}={value}").close()
+
+    @contextmanager
+    def bulk_import_mode(self):
+        """A context manager that tunes the connection for large imports into SQLite databases.
+        Does nothing on other backends.
+
+        Switches the database to write-ahead logging and stops syncing to disk on every commit.
+        Committed data still survives an application crash, but the last transactions may be lost
+        if the operating system crashes or power fails.
+        Write-ahead logging is stored in the database file and doesn't work on network drives.
+
+        The settings survive :meth:`reconnect` and the previous ones are restored when the context exits.
+        Must be entered and exited outside of a transaction, i.e., before adding any items and after committing them.
+        """
+        if not self.sa_url.drivername.startswith("sqlite"):
+            yield
+            return
+        previous_pragmas = {
+            name: self.connection.execute(f"PRAGMA {name}").scalar() for name in self._BULK_IMPORT_PRAGMAS
+        }
+        previous_connection_pragmas = self._connection_pragmas
+        self._connection_pragmas = self._BULK_IMPORT_PRAGMAS
+        self._execute_pragmas(self._connection_pragmas)
+        try:
+            yield
+        finally:
+            self._connection_pragmas = previous_connection_pragmas
+            self._execute_pragmas(previous_pragmas)
 
     def in_(self, column, values):
         """Returns an expression equivalent to column.in_(values), that circumvents the
@@ -501,7 +546,7 @@ class DatabaseMappingBase:
         for tablename in tablenames:
             if self.cache.pop(tablename, None):
                 self._do_advance_cache_query(tablename)
-        attr_names = set(attr for tablename in tablenames for attr in self._get_table_to_sq_attr().get(tablename, []))
+        attr_names = {attr for tablename in tablenames for attr in self._get_table_to_sq_attr().get(tablename, [])}
         for attr_name in attr_names:
             setattr(self, attr_name, None)
 
@@ -2005,6 +2050,19 @@ class DatabaseMappingBase:
             return
         return self.connection.execute(stmt, items)
 
+    @staticmethod
+    @contextmanager
+    def _reraise_dbapi_error(action):
+        """Re-raises any DBAPIError raised within the context as SpineDBAPIError.
+
+        Args:
+            action (str): what was being done, e.g. ``"inserting object items"``
+        """
+        try:
+            yield None
+        except DBAPIError as e:
+            raise SpineDBAPIError(f"DBAPIError while {action}: {e.orig.args}") from e
+
     def _get_primary_key(self, tablename):
         pk = self.composite_pks.get(tablename)
         if pk is None:
@@ -2047,10 +2105,13 @@ class DatabaseMappingBase:
 
     def _do_advance_cache_query(self, tablename):
         table_cache = self.cache.table_cache(tablename)
-        for x in self.query(getattr(self, self.cache_sqs[tablename])).yield_per(1000).enable_eagerloads(False):
-            table_cache.add_item(x._asdict())
+        # Core rows skip ORM result processing and convert to dicts directly
+        sq = getattr(self, self.cache_sqs[tablename])
+        result = self.connection.execution_options(stream_results=True).execute(sq.select())
+        for row in result:
+            table_cache.add_item(dict(row))
 
-    def _items_with_type_id(self, tablename, *items):
+    def _items_with_type_id(self, tablename, items):
         type_id = {
             "object_class": self.object_class_type,
             "relationship_class": self.relationship_class_type,
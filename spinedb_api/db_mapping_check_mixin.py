@@ -50,6 +50,9 @@ class DatabaseMappingCheckMixin:
     """Provides methods to check whether insert and update operations violate Spine db integrity constraints."""
 
     def check_items(self, tablename, *items, for_update=False, strict=False, cache=None):
+        if cache is None:
+            # The cache is about to be read from the database, so buffered rows need to be there
+            self.flush_pending()
         return {
             "alternative": self.check_alternatives,
             "scenario": self.check_scenarios,
@@ -615,7 +618,7 @@ class DatabaseMappingCheckMixin:
         }
         parameter_value_lists = {x.id: x.value_id_list for x in cache.get("parameter_value_list", {}).values()}
         list_values = {x.id: from_database(x.value, x.type) for x in cache.get("list_value", {}).values()}
-        alternatives = set(a.id for a in cache.get("alternative", {}).values())
+        alternatives = {a.id for a in cache.get("alternative", {}).values()}
         for item in items:
             entity_id = item.get("object_id") or item.get("relationship_id")
             if entity_id is not None:
@@ -64,6 +64,7 @@ class DatabaseMappingCommitMixin:
             comment (str): commit message
         """
         self._check_commit(comment)
+        self.flush_pending()
         commit = self._metadata.tables["commit"]
         user = self.username
         date = datetime.now(timezone.utc)
@@ -80,6 +81,7 @@ class DatabaseMappingCommitMixin:
         self.reset_session()
 
     def reset_session(self):
+        self._pending_inserts.clear()
         self.session.rollback()
         self.cache.clear()
         self._commit_id = None
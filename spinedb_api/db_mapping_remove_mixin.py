@@ -15,9 +15,6 @@
 :date:   11.8.2018
 """
 
-from sqlalchemy.exc import DBAPIError
-from .exception import SpineDBAPIError
-
 # TODO: improve docstrings
 
 
@@ -42,6 +39,8 @@ class DatabaseMappingRemoveMixin:
         """
         if not self.committing:
             return
+        # Buffered rows must be in the database for the removal to reach them
+        self.flush_pending()
         self._make_commit_id()
         for tablename, ids in kwargs.items():
             if not ids:
@@ -49,15 +48,12 @@ class DatabaseMappingRemoveMixin:
             table_id = self.table_ids.get(tablename, "id")
             table = self._metadata.tables[tablename]
             delete = table.delete().where(self.in_(getattr(table.c, table_id), ids))
-            try:
+            with self._reraise_dbapi_error(f"removing {tablename} items"):
                 self.connection.execute(delete)
                 table_cache = self.cache.get(tablename)
                 if table_cache:
                     for id_ in ids:
                         table_cache.remove_item(id_)
-            except DBAPIError as e:
-                msg = f"DBAPIError while removing {tablename} items: {e.orig.args}"
-                raise SpineDBAPIError(msg) from e
 
     # pylint: disable=redefined-builtin
     def cascading_ids(self, cache=None, **kwargs):
@@ -15,9 +15,7 @@
 :date:   11.8.2018
 """
 from collections import Counter
-from sqlalchemy.exc import DBAPIError
 from sqlalchemy.sql.expression import bindparam
-from .exception import SpineDBAPIError
 
 
 class DatabaseMappingUpdateMixin:
@@ -30,6 +28,8 @@ class DatabaseMappingUpdateMixin:
     def _update_items(self, tablename, *items):
         if not items:
             return set()
+        # Buffered rows must be in the database for the update to reach them
+        self.flush_pending()
         # Special cases
         if tablename == "relationship":
             return self._update_wide_relationships(*items)
@@ -39,7 +39,7 @@ class DatabaseMappingUpdateMixin:
             "object": "entity",
             "relationship": "entity",
         }.get(tablename, tablename)
-        items = self._items_with_type_id(tablename, *items)
+        items = self._items_with_type_id(tablename, items)
         return self._do_update_items(real_tablename, *items)
 
     def _do_update_items(self, tablename, *items):
@@ -50,11 +50,8 @@ class DatabaseMappingUpdateMixin:
             for k in self._get_primary_key(tablename):
                 upd = upd.where(getattr(table.c, k) == bindparam(k))
             upd = upd.values({key: bindparam(key) for key in table.columns.keys() & items[0].keys()})
-            try:
+            with self._reraise_dbapi_error(f"updating '{tablename}' items"):
                 self._checked_execute(upd, [{**item} for item in items])
-            except DBAPIError as e:
-                msg = f"DBAPIError while updating '{tablename}' items: {e.orig.args}"
-                raise SpineDBAPIError(msg)
         return {x["id"] for x in items}
 
     def update_items(self, tablename, *items, check=True, strict=False, return_items=False, cache=None):
@@ -125,7 +122,7 @@ class DatabaseMappingUpdateMixin:
         return self.update_items("relationship", *items, **kwargs)
 
     def _update_wide_relationships(self, *items):
-        items = self._items_with_type_id("relationship", *items)
+        items = self._items_with_type_id("relationship", items)
         entity_items = []
         relationship_entity_items = []
         for item in items:
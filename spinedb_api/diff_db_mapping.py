@@ -16,8 +16,8 @@ Provides :class:`DiffDatabaseMapping`.
 :date:   11.8.2018
 """
 
+from contextlib import contextmanager
 from sqlalchemy.sql.expression import bindparam
-from sqlalchemy.exc import DBAPIError
 from .db_mapping_query_mixin import DatabaseMappingQueryMixin
 from .db_mapping_check_mixin import DatabaseMappingCheckMixin
 from .db_mapping_add_mixin import DatabaseMappingAddMixin
@@ -26,7 +26,6 @@ from .db_mapping_remove_mixin import DatabaseMappingRemoveMixin
 from .diff_db_mapping_commit_mixin import DiffDatabaseMappingCommitMixin
 from .diff_db_mapping_base import DiffDatabaseMappingBase
 from .filters.tools import apply_filter_stack, load_filters
-from .exception import SpineDBAPIError
 
 
 class DiffDatabaseMapping(
@@ -48,6 +47,8 @@ class DiffDatabaseMapping(
     :param str db_url: A database URL in RFC-1738 format pointing to the database to be mapped.
     :param str username: A user name. If ``None``, it gets replaced by the string ``"anon"``.
     :param bool upgrade: Whether or not the db at the given URL should be upgraded to the most recent version.
+    :ivar bool auto_flush: Whether inserts are executed right away (the default) or buffered until
+        :meth:`flush_pending` or commit, see :class:`.DatabaseMappingAddMixin`.
     """
 
     def __init__(self, *args, **kwargs):
@@ -57,19 +58,56 @@ class DiffDatabaseMapping(
             stack = load_filters(self._filter_configs)
             apply_filter_stack(self, stack)
 
+    @contextmanager
+    def staged_adds(self):
+        """A context manager that stages all additions made within it in a single database transaction,
+        instead of one transaction per insert.
+
+        If an error is raised within the context, the transaction is rolled back
+        so none of the items added within it remain staged, and the error is re-raised.
+
+        Example::
+
+            with db_map.staged_adds():
+                db_map.add_objects(*objects)
+                db_map.add_parameter_values(*values)
+        """
+        added_item_id = {tablename: ids.copy() for tablename, ids in self.added_item_id.items()}
+        transaction = self.connection.begin()
+        try:
+            yield None
+        except BaseException:
+            transaction.rollback()
+            tablenames = [
+                tablename for tablename, ids in self.added_item_id.items() if ids != added_item_id.get(tablename)
+            ]
+            self.added_item_id = added_item_id
+            self._clear_subqueries(*tablenames)
+            raise
+        else:
+            transaction.commit()
+
     def _add_items(self, tablename, *items):
-        self._add_commit_id_and_ids(tablename, *items)
+        self._add_commit_id_and_ids(tablename, items)
         ids = {x["id"] for x in items}
-        for tablename_ in self._do_add_items(tablename, *items):
-            self.added_item_id[tablename_].update(ids)
-            self._clear_subqueries(tablename_)
+        self._do_add_and_track_items(tablename, ids, items)
         return ids
 
     def _readd_items(self, tablename, *items):
-        ids = set(x["id"] for x in items)
-        for tablename_ in self._do_add_items(tablename, *items):
-            self.added_item_id[tablename_].update(ids)
-            self._clear_subqueries(tablename_)
+        ids = {x["id"] for x in items}
+        self._do_add_and_track_items(tablename, ids, items)
+
+    def _do_add_and_track_items(self, tablename, ids, items):
+        """Adds items and records their ids as added in every table the insert touched.
+        Subqueries are cleared once for all those tables."""
+        added_item_id = self.added_item_id
+        tablenames = []
+        try:
+            for tablename_ in self._do_add_items(tablename, items):
+                added_item_id[tablename_].update(ids)
+                tablenames.append(tablename_)
+        finally:
+            self._clear_subqueries(*tablenames)
 
     def _get_table_for_insert(self, tablename):
         return self._diff_table(tablename)
@@ -98,13 +136,10 @@ class DiffDatabaseMapping(
             tablename, items
         )
         if self.committing:
-            try:
+            with self._reraise_dbapi_error(f"updating {tablename} items"):
                 self._update_and_insert_items(tablename, items_for_update, items_for_insert)
                 self._mark_as_dirty(tablename, dirty_ids)
                 self.updated_item_id[tablename].update(dirty_ids)
-            except DBAPIError as e:
-                msg = f"DBAPIError while updating {tablename} items: {e.orig.args}"
-                raise SpineDBAPIError(msg)
         return updated_ids
 
     def _update_and_insert_items(self, tablename, items_for_update, items_for_insert):
@@ -120,7 +155,7 @@ class DiffDatabaseMapping(
 
     def _update_wide_relationships(self, *items):
         """Update relationships without checking integrity."""
-        items = self._items_with_type_id("relationship", *items)
+        items = self._items_with_type_id("relationship", items)
         ent_items = []
         rel_ent_items = []
         for item in items:
@@ -136,7 +171,7 @@ class DiffDatabaseMapping(
                 rel_ent_item["member_class_id"] = member_class_id
                 rel_ent_item["member_id"] = member_id
                 rel_ent_items.append(rel_ent_item)
-        try:
+        with self._reraise_dbapi_error("updating relationships"):
             ents_for_update, ents_for_insert, dirty_ent_ids, updated_ent_ids = self._get_items_for_update_and_insert(
                 "entity", ent_items
             )
@@ -153,9 +188,6 @@ class DiffDatabaseMapping(
             self._mark_as_dirty("relationship_entity", dirty_rel_ent_ids)
             self.updated_item_id["relationship_entity"].update(dirty_rel_ent_ids)
             return updated_ent_ids.union(updated_rel_ent_ids)
-        except DBAPIError as e:
-            msg = "DBAPIError while updating relationships: {}".format(e.orig.args)
-            raise SpineDBAPIError(msg)
 
     def remove_items(self, **kwargs):
         """Removes items by id, *not in cascade*.
@@ -164,15 +196,14 @@ class DiffDatabaseMapping(
             **kwargs: keyword is table name, argument is list of ids to remove
         """
         if self.committing:
+            # Buffered rows must be in the diff tables for the removal to reach them
+            self.flush_pending()
             for tablename, ids in kwargs.items():
                 table_id = self.table_ids.get(tablename, "id")
                 diff_table = self._diff_table(tablename)
                 delete = diff_table.delete().where(self.in_(getattr(diff_table.c, table_id), ids))
-                try:
+                with self._reraise_dbapi_error(f"removing {tablename} items"):
                     self.connection.execute(delete)
-                except DBAPIError as e:
-                    msg = f"DBAPIError while removing {tablename} items: {e.orig.args}"
-                    raise SpineDBAPIError(msg)
         for tablename, ids in kwargs.items():
             self.added_item_id[tablename].difference_update(ids)
             self.updated_item_id[tablename].difference_update(ids)
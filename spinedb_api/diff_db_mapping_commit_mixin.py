@@ -32,6 +32,7 @@ class DiffDatabaseMappingCommitMixin:
             comment (str): An informative comment explaining the nature of the commit.
         """
         self._check_commit(comment)
+        self.flush_pending()
         transaction = self.connection.begin()
         try:
             user = self.username
@@ -92,6 +93,7 @@ class DiffDatabaseMappingCommitMixin:
         self.reset_session()
 
     def reset_session(self):
+        self._pending_inserts.clear()
         transaction = self.connection.begin()
         try:
             self._reset_diff_mapping()
@@ -15,6 +15,7 @@ Functions for exporting data from a Spine database using entity names as referen
 :author: M. Marin (KTH)
 :date:   1.4.2020
 """
+from collections import defaultdict
 from operator import itemgetter
 
 from sqlalchemy.util import KeyedTuple
@@ -69,38 +70,81 @@ def export_data(
     Returns:
         dict: exported data
     """
-    data = {
-        "object_classes": export_object_classes(db_map, object_class_ids, make_cache=make_cache),
-        "relationship_classes": export_relationship_classes(db_map, relationship_class_ids, make_cache=make_cache),
-        "parameter_value_lists": export_parameter_value_lists(
-            db_map, parameter_value_list_ids, make_cache=make_cache, parse_value=parse_value
-        ),
-        "object_parameters": export_object_parameters(
-            db_map, object_parameter_ids, make_cache=make_cache, parse_value=parse_value
-        ),
-        "relationship_parameters": export_relationship_parameters(
-            db_map, relationship_parameter_ids, make_cache=make_cache, parse_value=parse_value
-        ),
-        "objects": export_objects(db_map, object_ids, make_cache=make_cache),
-        "relationships": export_relationships(db_map, relationship_ids, make_cache=make_cache),
-        "object_groups": export_object_groups(db_map, object_group_ids, make_cache=make_cache),
-        "object_parameter_values": export_object_parameter_values(
-            db_map, object_parameter_value_ids, make_cache=make_cache, parse_value=parse_value
-        ),
-        "relationship_parameter_values": export_relationship_parameter_values(
-            db_map, relationship_parameter_value_ids, make_cache=make_cache, parse_value=parse_value
-        ),
-        "alternatives": export_alternatives(db_map, alternative_ids, make_cache=make_cache),
-        "scenarios": export_scenarios(db_map, scenario_ids, make_cache=make_cache),
-        "scenario_alternatives": export_scenario_alternatives(db_map, scenario_alternative_ids, make_cache=make_cache),
-        "tools": export_tools(db_map, tool_ids, make_cache=make_cache),
-        "features": export_features(db_map, feature_ids, make_cache=make_cache),
-        "tool_features": export_tool_features(db_map, tool_feature_ids, make_cache=make_cache),
-        "tool_feature_methods": export_tool_feature_methods(
-            db_map, tool_feature_method_ids, make_cache=make_cache, parse_value=parse_value
+    if make_cache is None:
+        make_cache = _make_shared_cache_maker(
+            db_map,
+            {
+                "object_class": object_class_ids,
+                "relationship_class": relationship_class_ids,
+                "parameter_value_list": parameter_value_list_ids,
+                "list_value": parameter_value_list_ids,
+                "parameter_definition": (object_parameter_ids, relationship_parameter_ids),
+                "object": object_ids,
+                "entity_group": object_group_ids,
+                "relationship": relationship_ids,
+                "parameter_value": (object_parameter_value_ids, relationship_parameter_value_ids),
+                "alternative": alternative_ids,
+                "scenario": scenario_ids,
+                "scenario_alternative": scenario_alternative_ids,
+                "tool": tool_ids,
+                "feature": feature_ids,
+                "tool_feature": tool_feature_ids,
+                "tool_feature_method": tool_feature_method_ids,
+            },
+        )
+    plain_kwargs = {"make_cache": make_cache}
+    value_kwargs = {"make_cache": make_cache, "parse_value": parse_value}
+    data = {}
+    for key, export, ids, kwargs in (
+        ("object_classes", export_object_classes, object_class_ids, plain_kwargs),
+        ("relationship_classes", export_relationship_classes, relationship_class_ids, plain_kwargs),
+        ("parameter_value_lists", export_parameter_value_lists, parameter_value_list_ids, value_kwargs),
+        ("object_parameters", export_object_parameters, object_parameter_ids, value_kwargs),
+        ("relationship_parameters", export_relationship_parameters, relationship_parameter_ids, value_kwargs),
+        ("objects", export_objects, object_ids, plain_kwargs),
+        ("relationships", export_relationships, relationship_ids, plain_kwargs),
+        ("object_groups", export_object_groups, object_group_ids, plain_kwargs),
+        ("object_parameter_values", export_object_parameter_values, object_parameter_value_ids, value_kwargs),
+        (
+            "relationship_parameter_values",
+            export_relationship_parameter_values,
+            relationship_parameter_value_ids,
+            value_kwargs,
         ),
+        ("alternatives", export_alternatives, alternative_ids, plain_kwargs),
+        ("scenarios", export_scenarios, scenario_ids, plain_kwargs),
+        ("scenario_alternatives", export_scenario_alternatives, scenario_alternative_ids, plain_kwargs),
+        ("tools", export_tools, tool_ids, plain_kwargs),
+        ("features", export_features, feature_ids, plain_kwargs),
+        ("tool_features", export_tool_features, tool_feature_ids, plain_kwargs),
+        ("tool_feature_methods", export_tool_feature_methods, tool_feature_method_ids, value_kwargs),
+    ):
+        if not ids:
+            continue
+        exported = export(db_map, ids, **kwargs)
+        if exported:
+            data[key] = exported
+    return data
+
+
+def _make_shared_cache_maker(db_map, ids_per_table):
+    """Fills the cache once for all tables that will be exported.
+
+    db_map.make_cache re-queries every table it is asked for, so letting each exporter call it
+    would query common ancestor tables over and over.
+
+    Args:
+        db_map (DatabaseMappingBase): database mapping
+        ids_per_table (dict): mapping from table name to ids, or tuple of ids, to export
+
+    Returns:
+        Callable: a replacement for db_map.make_cache that returns the filled cache
+    """
+    tablenames = {
+        tablename for tablename, ids in ids_per_table.items() if (any(ids) if isinstance(ids, tuple) else ids)
     }
-    return {key: value for key, value in data.items() if value}
+    cache = db_map.make_cache(tablenames, include_ancestors=True)
+    return lambda *args, **kwargs: cache
 
 
 def _get_items(db_map, tablename, ids, make_cache):
@@ -146,91 +190,117 @@ class _ParameterValueListProcessor:
 
 
 def export_object_classes(db_map, ids=Asterisk, make_cache=None):
-    return sorted((x.name, x.description, x.display_icon) for x in _get_items(db_map, "object_class", ids, make_cache))
+    return sorted(
+        [
+            (x.get("name"), x.get("description"), x.get("display_icon"))
+            for x in _get_items(db_map, "object_class", ids, make_cache)
+        ]
+    )
 
 
 def export_objects(db_map, ids=Asterisk, make_cache=None):
-    return sorted((x.class_name, x.name, x.description) for x in _get_items(db_map, "object", ids, make_cache))
+    return sorted(
+        [
+            (x.get("class_name"), x.get("name"), x.get("description"))
+            for x in _get_items(db_map, "object", ids, make_cache)
+        ]
+    )
 
 
 def export_relationship_classes(db_map, ids=Asterisk, make_cache=None):
     return sorted(
-        (x.name, x.object_class_name_list, x.description, x.display_icon)
-        for x in _get_items(db_map, "relationship_class", ids, make_cache)
+        [
+            (x.get("name"), x.get("object_class_name_list"), x.get("description"), x.get("display_icon"))
+            for x in _get_items(db_map, "relationship_class", ids, make_cache)
+        ]
     )
 
 
 def export_parameter_value_lists(db_map, ids=Asterisk, make_cache=None, parse_value=from_database):
     return sorted(
-        ((x.name, parse_value(x.value, x.type)) for x in _get_items(db_map, "parameter_value_list", ids, make_cache)),
+        [(x.name, parse_value(x.value, x.type)) for x in _get_items(db_map, "parameter_value_list", ids, make_cache)],
         key=itemgetter(0),
     )
 
 
 def export_object_parameters(db_map, ids=Asterisk, make_cache=None, parse_value=from_database):
     return sorted(
-        (
-            x.object_class_name,
-            x.parameter_name,
-            parse_value(x.default_value, x.default_type),
-            x.value_list_name,
-            x.description,
-        )
-        for x in _get_items(db_map, "parameter_definition", ids, make_cache)
-        if x.object_class_id
+        [
+            (
+                x.get("object_class_name"),
+                x.get("parameter_name"),
+                parse_value(x.get("default_value"), x.get("default_type")),
+                x.get("value_list_name"),
+                x.get("description"),
+            )
+            for x in _get_items(db_map, "parameter_definition", ids, make_cache)
+            if x.get("object_class_id")
+        ]
     )
 
 
 def export_relationship_parameters(db_map, ids=Asterisk, make_cache=None, parse_value=from_database):
     return sorted(
-        (
-            x.relationship_class_name,
-            x.parameter_name,
-            parse_value(x.default_value, x.default_type),
-            x.value_list_name,
-            x.description,
-        )
-        for x in _get_items(db_map, "parameter_definition", ids, make_cache)
-        if x.relationship_class_id
+        [
+            (
+                x.get("relationship_class_name"),
+                x.get("parameter_name"),
+                parse_value(x.get("default_value"), x.get("default_type")),
+                x.get("value_list_name"),
+                x.get("description"),
+            )
+            for x in _get_items(db_map, "parameter_definition", ids, make_cache)
+            if x.get("relationship_class_id")
+        ]
     )
 
 
 def export_relationships(db_map, ids=Asterisk, make_cache=None):
-    return sorted((x.class_name, x.object_name_list) for x in _get_items(db_map, "relationship", ids, make_cache))
+    return sorted(
+        [(x.get("class_name"), x.get("object_name_list")) for x in _get_items(db_map, "relationship", ids, make_cache)]
+    )
 
 
 def export_object_groups(db_map, ids=Asterisk, make_cache=None):
     return sorted(
-        (x.class_name, x.group_name, x.member_name)
-        for x in _get_items(db_map, "entity_group", ids, make_cache)
-        if x.object_class_id
+        [
+            (x.get("class_name"), x.get("group_name"), x.get("member_name"))
+            for x in _get_items(db_map, "entity_group", ids, make_cache)
+            if x.get("object_class_id")
+        ]
     )
 
 
 def export_object_parameter_values(db_map, ids=Asterisk, make_cache=None, parse_value=from_database):
     return sorted(
-        (
-            (x.object_class_name, x.object_name, x.parameter_name, parse_value(x.value, x.type), x.alternative_name)
+        [
+            (
+                x.get("object_class_name"),
+                x.get("object_name"),
+                x.get("parameter_name"),
+                parse_value(x.get("value"), x.get("type")),
+                x.get("alternative_name"),
+            )
             for x in _get_items(db_map, "parameter_value", ids, make_cache)
-            if x.object_id
-        ),
+            if x.get("object_id")
+        ],
         key=lambda x: x[:3] + (x[-1],),
     )
 
 
 def export_relationship_parameter_values(db_map, ids=Asterisk, make_cache=None, parse_value=from_database):
     return sorted(
-        (
+        [
             (
-                x.relationship_class_name,
-                x.object_name_list,
-                x.parameter_name,
-                parse_value(x.value, x.type),
-                x.alternative_name,
+                x.get("relationship_class_name"),
+                x.get("object_name_list"),
+                x.get("parameter_name"),
+                parse_value(x.get("value"), x.get("type")),
+                x.get("alternative_name"),
             )
             for x in _get_items(db_map, "parameter_value", ids, make_cache)
-            if x.relationship_id
-        ),
+            if x.get("relationship_id")
+        ],
         key=lambda x: x[:3] + (x[-1],),
     )
 
@@ -248,7 +318,7 @@ def export_alternatives(db_map, ids=Asterisk, make_cache=None):
     Returns:
         Iterable: tuples of two elements: name of alternative and description
     """
-    return sorted((x.name, x.description) for x in _get_items(db_map, "alternative", ids, make_cache))
+    return sorted([(x.get("name"), x.get("description")) for x in _get_items(db_map, "alternative", ids, make_cache)])
 
 
 def export_scenarios(db_map, ids=Asterisk, make_cache=None):
@@ -264,7 +334,12 @@ def export_scenarios(db_map, ids=Asterisk, make_cache=None):
     Returns:
         Iterable: tuples of two elements: name of scenario and description
     """
-    return sorted((x.name, x.active, x.description) for x in _get_items(db_map, "scenario", ids, make_cache))
+    return sorted(
+        [
+            (x.get("name"), x.get("active"), x.get("description"))
+            for x in _get_items(db_map, "scenario", ids, make_cache)
+        ]
+    )
 
 
 def export_scenario_alternatives(db_map, ids=Asterisk, make_cache=None):
@@ -281,35 +356,67 @@ def export_scenario_alternatives(db_map, ids=Asterisk, make_cache=None):
         Iterable: tuples of three elements: name of scenario, tuple containing one alternative name,
             and name of next alternative
     """
+    if not ids:
+        return []
+    if make_cache is None:
+        make_cache = db_map.make_cache
+    cache = make_cache({"scenario_alternative"}, include_ancestors=True)
+    # Resolving before_alternative_name item by item sorts all scenario alternatives every time,
+    # so we collect each scenario's alternatives in rank order once instead.
+    alternative_names = defaultdict(list)
+    for x in sorted(cache.get("scenario_alternative", {}).values(), key=itemgetter("rank")):
+        alternative_names[x.get("scenario_id")].append(x.get("alternative_name"))
+
+    def before_alternative_name(item):
+        names = alternative_names.get(item.get("scenario_id"), ())
+        rank = item.get("rank")
+        return names[rank] if rank < len(names) else None
+
     return sorted(
-        (
-            (x.scenario_name, x.alternative_name, x.before_alternative_name)
-            for x in _get_items(db_map, "scenario_alternative", ids, make_cache)
-        ),
+        [
+            (x.get("scenario_name"), x.get("alternative_name"), before_alternative_name(x))
+            for x in _get_items_from_cache(cache, "scenario_alternative", ids)
+        ],
         key=itemgetter(0),
     )
 
 
 def export_tools(db_map, ids=Asterisk, make_cache=None):
-    return sorted((x.name, x.description) for x in _get_items(db_map, "tool", ids, make_cache))
+    return sorted([(x.get("name"), x.get("description")) for x in _get_items(db_map, "tool", ids, make_cache)])
 
 
 def export_features(db_map, ids=Asterisk, make_cache=None):
     return sorted(
-        (x.entity_class_name, x.parameter_definition_name, x.parameter_value_list_name, x.description)
-        for x in _get_items(db_map, "feature", ids, make_cache)
+        [
+            (
+                x.get("entity_class_name"),
+                x.get("parameter_definition_name"),
+                x.get("parameter_value_list_name"),
+                x.get("description"),
+            )
+            for x in _get_items(db_map, "feature", ids, make_cache)
+        ]
     )
 
 
 def export_tool_features(db_map, ids=Asterisk, make_cache=None):
     return sorted(
-        (x.tool_name, x.entity_class_name, x.parameter_definition_name, x.required)
-        for x in _get_items(db_map, "tool_feature", ids, make_cache)
+        [
+            (x.get("tool_name"), x.get("entity_class_name"), x.get("parameter_definition_name"), x.get("required"))
+            for x in _get_items(db_map, "tool_feature", ids, make_cache)
+        ]
     )
 
 
 def export_tool_feature_methods(db_map, ids=Asterisk, make_cache=None, parse_value=from_database):
     return sorted(
-        (x.tool_name, x.entity_class_name, x.parameter_definition_name, parse_value(x.method, None))
-        for x in _get_items(db_map, "tool_feature_method", ids, make_cache)
+        [
+            (
+                x.get("tool_name"),
+                x.get("entity_class_name"),
+                x.get("parameter_definition_name"),
+                parse_value(x.get("method"), None),
+            )
+            for x in _get_items(db_map, "tool_feature_method", ids, make_cache)
+        ]
     )
@@ -15,8 +15,8 @@ Contains export mappings for database items such as entities, entity classes and
 :date:   10.12.2020
 """
 
-from dataclasses import dataclass
-from itertools import cycle, dropwhile, islice
+from functools import lru_cache
+from itertools import cycle, islice
 from sqlalchemy import and_, or_
 from sqlalchemy.sql.expression import literal
 from ..parameter_value import (
@@ -73,6 +73,8 @@ class ExportMapping(Mapping):
         self._ignorable = False
         self.header = header
         self._convert_data = None
+        self._name_field = self.name_field()
+        self._id_field = self.id_field()
 
     def __eq__(self, other):
         if not isinstance(other, ExportMapping):
@@ -342,7 +344,7 @@ class ExportMapping(Mapping):
         Returns:
             any
         """
-        return getattr(db_row, self.name_field(), None)
+        return getattr(db_row, self._name_field, None)
 
     def _expand_data(self, data):
         """Takes data from an individual field in the db and yields all data generated by this mapping.
@@ -366,11 +368,19 @@ class ExportMapping(Mapping):
             data (any)
 
         Returns:
-            generator(any)
+            Iterable(any)
         """
+        if type(self)._expand_data is ExportMapping._expand_data:
+            # Single datum: skip building a generator pipeline.
+            if self._filter_re is not None and not self._filter_re.search(str(data)):
+                return ()
+            if self._convert_data is not None:
+                data = self._convert_data(data)
+            return (data,)
         data_iterator = self._expand_data(data)
         if self._filter_re is not None:
-            data_iterator = (x for x in data_iterator if self._filter_re.search(str(x)))
+            search = self._filter_re.search
+            data_iterator = (x for x in data_iterator if search(str(x)))
         if self._convert_data is not None:
             data_iterator = (self._convert_data(x) for x in data_iterator)
         return data_iterator
@@ -388,29 +398,42 @@ class ExportMapping(Mapping):
             yield {}
             return
         data = self._data(db_row)
-        if data is None and not self._ignorable:
-            return ()
-        data_iterator = self._get_data_iterator(data)
-        for data in data_iterator:
-            yield {self.position: data}
-
-    def get_rows_recursive(self, db_row):
+        if data is None:
+            if not self._ignorable:
+                return
+        position = self.position
+        for data in self._get_data_iterator(data):
+            yield {position: data}
+
+    def get_rows_iterative(self, db_row):
         """Takes a database row and yields rows issued by this mapping and its children combined.
 
+        Walks the flattened hierarchy depth-first filling a single row dict instead of copying it at every level.
+        If several mappings write to the same position, e.g. ``Position.hidden``, the deepest one wins.
+
         Args:
             db_row (KeyedTuple)
 
         Returns:
             generator(dict)
         """
-        if self.child is None:
-            yield from self._get_rows(db_row)
-            return
-        for row in self._get_rows(db_row):
-            for child_row in self.child.get_rows_recursive(db_row):
-                row = row.copy()
-                row.update(child_row)
-                yield row
+        mappings = self.flatten()
+        last = len(mappings) - 1
+        iterators = [None] * len(mappings)
+        iterators[0] = mappings[0]._get_rows(db_row)
+        row = {}
+        depth = 0
+        while depth >= 0:
+            level_row = next(iterators[depth], None)
+            if level_row is None:
+                depth -= 1
+                continue
+            row.update(level_row)
+            if depth == last:
+                yield row.copy()
+                continue
+            depth += 1
+            iterators[depth] = mappings[depth]._get_rows(db_row)
 
     def rows(self, db_map, title_state):
         """Yields rows issued by this mapping and its children combined.
@@ -424,7 +447,7 @@ class ExportMapping(Mapping):
         """
         qry = self._build_query(db_map, title_state)
         for db_row in qry.yield_per(1000):
-            yield from self.get_rows_recursive(db_row)
+            yield from self.get_rows_iterative(db_row)
 
     def has_titles(self):
         """Returns True if this mapping or one of its children generates titles.
@@ -450,7 +473,7 @@ class ExportMapping(Mapping):
         Returns:
             dict
         """
-        id_field = self.id_field()
+        id_field = self._id_field
         if id_field is None:
             return {}
         return {id_field: getattr(db_row, id_field)}
@@ -523,7 +546,11 @@ class ExportMapping(Mapping):
         """
         titles = {}
         for title, title_state in self._non_unique_titles(db_map, limit=limit):
-            titles.setdefault(title, {}).update(title_state)
+            existing_state = titles.get(title)
+            if existing_state is None:
+                titles[title] = dict(title_state)
+            else:
+                existing_state.update(title_state)
         yield from titles.items()
 
     def has_header(self):
@@ -593,9 +620,10 @@ def drop_non_positioned_tail(root_mapping):
         Mapping: modified mapping hierarchy
     """
     mappings = root_mapping.flatten()
-    return unflatten(
-        reversed(list(dropwhile(lambda m: m.position == Position.hidden and not m.filter_re, reversed(mappings))))
-    )
+    end = len(mappings)
+    while end > 0 and mappings[end - 1].position == Position.hidden and not mappings[end - 1].filter_re:
+        end -= 1
+    return unflatten(mappings[:end])
 
 
 class FixedValueMapping(ExportMapping):
@@ -846,7 +874,7 @@ class RelationshipClassObjectClassMapping(ExportMapping):
         return "object_class_id_list"
 
     def _data(self, db_row):
-        data = super()._data(db_row).split(",")
+        data = _split_name_list(super()._data(db_row))
         if self._cached_dimension is None:
             self._cached_dimension = self.query_parents("dimension")
         try:
@@ -958,7 +986,7 @@ class RelationshipObjectMapping(ExportMapping):
         return "object_id_list"
 
     def _data(self, db_row):
-        data = super()._data(db_row).split(",")
+        data = _split_name_list(super()._data(db_row))
         if self._cached_dimension is None:
             self._cached_dimension = self.query_parents("dimension")
         try:
@@ -1071,7 +1099,7 @@ class ParameterDefaultValueTypeMapping(ParameterDefaultValueMapping):
         pv = title_state.pop("type_and_dimensions", None)
         if pv is None:
             return query
-        if "default_value" not in {c["name"] for c in query.column_descriptions}:
+        if not _has_column(query, "default_value"):
             return query
         return _FilteredQuery(
             query,
@@ -1106,7 +1134,7 @@ class ParameterDefaultValueIndexMapping(_MappingWithLeafMixin, ExportMapping):
     MAP_TYPE = "ParameterDefaultValueIndex"
 
     def add_query_columns(self, db_map, query):
-        if "default_value" in {c["name"] for c in query.column_descriptions}:
+        if _has_column(query, "default_value"):
             return query
         return query.add_columns(
             db_map.parameter_definition_sq.c.default_value, db_map.parameter_definition_sq.c.default_type
@@ -1166,7 +1194,7 @@ class ParameterValueMapping(ExportMapping):
     _selects_value = False
 
     def add_query_columns(self, db_map, query):
-        if "value" in {c["name"] for c in query.column_descriptions}:
+        if _has_column(query, "value"):
             return query
         self._selects_value = True
         return query.add_columns(db_map.parameter_value_sq.c.value, db_map.parameter_value_sq.c.type)
@@ -1231,7 +1259,7 @@ class ParameterValueTypeMapping(ParameterValueMapping):
         pv = title_state.pop("type_and_dimensions", None)
         if pv is None:
             return query
-        if "value" not in {c["name"] for c in query.column_descriptions}:
+        if not _has_column(query, "value"):
             return query
         return _FilteredQuery(
             query, lambda db_row: (db_row.type, from_database_to_dimension_count(db_row.value, db_row.type) == pv)
@@ -1770,9 +1798,7 @@ class _FilteredQuery:
         return _FilteredQuery(self._query.filter(*args, **kwargs), self._condition)
 
     def __iter__(self):
-        for db_row in self._query:
-            if self._condition(db_row):
-                yield db_row
+        return filter(self._condition, self._query)
 
 
 class _Rewindable:
@@ -1806,21 +1832,19 @@ def pair_header_buddies(root_mapping):
     Returns:
         list of tuple: pairs of parent mapping - buddy child mapping
     """
-
-    @dataclass
-    class Pairable:
-        mapping: ExportMapping
-        paired: bool
-
-    pairables = [Pairable(m, False) for m in root_mapping.flatten()]
+    mappings = root_mapping.flatten()
+    header_indices = [i for i, m in enumerate(mappings) if m.position == Position.header]
+    if not header_indices:
+        return []
+    paired = len(mappings) * [False]
     buddies = list()
-    for i, parent in enumerate(pairables):
-        if parent.mapping.position != Position.header:
-            continue
-        for child in pairables[i + 1 :]:
-            if child.mapping.is_buddy(parent.mapping) and not child.paired:
-                buddies.append((parent.mapping, child.mapping))
-                child.paired = True
+    for i in header_indices:
+        parent = mappings[i]
+        for j in range(i + 1, len(mappings)):
+            child = mappings[j]
+            if not paired[j] and child.is_buddy(parent):
+                buddies.append((parent, child))
+                paired[j] = True
                 break
     return buddies
 
@@ -1841,6 +1865,54 @@ def find_my_buddy(mapping, buddies):
     return None
 
 
+_MAPPINGS_BY_TYPE = {
+    klass.MAP_TYPE: klass
+    for klass in (
+        AlternativeDescriptionMapping,
+        AlternativeMapping,
+        DefaultValueIndexNameMapping,
+        ExpandedParameterDefaultValueMapping,
+        ExpandedParameterValueMapping,
+        FeatureEntityClassMapping,
+        FeatureParameterDefinitionMapping,
+        FixedValueMapping,
+        IndexNameMapping,
+        ObjectClassMapping,
+        ObjectGroupMapping,
+        ObjectGroupObjectMapping,
+        ObjectMapping,
+        ParameterDefaultValueIndexMapping,
+        ParameterDefaultValueMapping,
+        ParameterDefaultValueTypeMapping,
+        ParameterDefinitionMapping,
+        ParameterValueIndexMapping,
+        ParameterValueListMapping,
+        ParameterValueListValueMapping,
+        ParameterValueMapping,
+        ParameterValueTypeMapping,
+        RelationshipClassMapping,
+        RelationshipClassObjectClassMapping,
+        RelationshipClassObjectHighlightingMapping,
+        RelationshipMapping,
+        RelationshipObjectHighlightingMapping,
+        RelationshipObjectMapping,
+        ScenarioActiveFlagMapping,
+        ScenarioAlternativeMapping,
+        ScenarioBeforeAlternativeMapping,
+        ScenarioDescriptionMapping,
+        ScenarioMapping,
+        ToolMapping,
+        ToolFeatureEntityClassMapping,
+        ToolFeatureParameterDefinitionMapping,
+        ToolFeatureRequiredFlagMapping,
+        ToolFeatureMethodEntityClassMapping,
+        ToolFeatureMethodParameterDefinitionMapping,
+    )
+}
+# Legacy
+_MAPPINGS_BY_TYPE["ParameterIndex"] = ParameterValueIndexMapping
+
+
 def from_dict(serialized):
     """
     Deserializes mappings.
@@ -1851,52 +1923,6 @@ def from_dict(serialized):
     Returns:
         ExportMapping: root mapping
     """
-    mappings = {
-        klass.MAP_TYPE: klass
-        for klass in (
-            AlternativeDescriptionMapping,
-            AlternativeMapping,
-            DefaultValueIndexNameMapping,
-            ExpandedParameterDefaultValueMapping,
-            ExpandedParameterValueMapping,
-            FeatureEntityClassMapping,
-            FeatureParameterDefinitionMapping,
-            FixedValueMapping,
-            IndexNameMapping,
-            ObjectClassMapping,
-            ObjectGroupMapping,
-            ObjectGroupObjectMapping,
-            ObjectMapping,
-            ParameterDefaultValueIndexMapping,
-            ParameterDefaultValueMapping,
-            ParameterDefaultValueTypeMapping,
-            ParameterDefinitionMapping,
-            ParameterValueIndexMapping,
-            ParameterValueListMapping,
-            ParameterValueListValueMapping,
-            ParameterValueMapping,
-            ParameterValueTypeMapping,
-            RelationshipClassMapping,
-            RelationshipClassObjectClassMapping,
-            RelationshipClassObjectHighlightingMapping,
-            RelationshipMapping,
-            RelationshipObjectHighlightingMapping,
-            RelationshipObjectMapping,
-            ScenarioActiveFlagMapping,
-            ScenarioAlternativeMapping,
-            ScenarioBeforeAlternativeMapping,
-            ScenarioDescriptionMapping,
-            ScenarioMapping,
-            ToolMapping,
-            ToolFeatureEntityClassMapping,
-            ToolFeatureParameterDefinitionMapping,
-            ToolFeatureRequiredFlagMapping,
-            ToolFeatureMethodEntityClassMapping,
-            ToolFeatureMethodParameterDefinitionMapping,
-        )
-    }
-    # Legacy
-    mappings["ParameterIndex"] = ParameterValueIndexMapping
     flattened = list()
     for mapping_dict in serialized:
         position = mapping_dict["position"]
@@ -1907,7 +1933,9 @@ def from_dict(serialized):
         header = mapping_dict.get("header", "")
         filter_re = mapping_dict.get("filter_re", "")
         flattened.append(
-            mappings[mapping_dict["map_type"]].reconstruct(position, value, header, filter_re, ignorable, mapping_dict)
+            _MAPPINGS_BY_TYPE[mapping_dict["map_type"]].reconstruct(
+                position, value, header, filter_re, ignorable, mapping_dict
+            )
         )
     return unflatten(flattened)
 
@@ -1930,6 +1958,35 @@ def legacy_group_fn_from_dict(serialized):
     return NoGroup.NAME
 
 
+@lru_cache(maxsize=256)
+def _split_name_list(name_list):
+    """Splits a comma separated name list.
+
+    Sibling dimension mappings read the same list from each database row,
+    so the split is cached.
+
+    Args:
+        name_list (str): comma separated names
+
+    Returns:
+        tuple of str: names
+    """
+    return tuple(name_list.split(","))
+
+
+def _has_column(query, name):
+    """Checks if query selects a column with given name.
+
+    Args:
+        query (Alias or dict): a subquery
+        name (str): column name
+
+    Returns:
+        bool: True if query has the column, False otherwise
+    """
+    return any(c["name"] == name for c in query.column_descriptions)
+
+
 def _expand_indexed_data(data, mapping):
     """Expands indexed data and updates the current_leaf attribute.
 
@@ -19,6 +19,7 @@ Contains the GraphLayoutGenerator class.
 import math
 import numpy as np
 from numpy import atleast_1d as arr
+from scipy.sparse import csr_matrix
 from scipy.sparse.csgraph import dijkstra
 
 
@@ -59,6 +60,30 @@ class GraphLayoutGenerator:
     def emit_msg(self, text):
         """Emits msg"""
 
+    def _adjacency_matrix(self):
+        """Returns the sparse, symmetric adjacency matrix of the graph.
+
+        Each edge has weight ``spread``; repeated edges are not summed.
+        Indices follow NumPy indexing rules, i.e. negative indices count from the last vertex.
+        If the index lists do not make up a valid set of edges, the graph is left without edges.
+
+        Returns:
+            csr_matrix: adjacency matrix
+        """
+        shape = (self.vertex_count, self.vertex_count)
+        vertices = np.arange(self.vertex_count)
+        try:
+            src_inds, dst_inds = np.broadcast_arrays(vertices[arr(self.src_inds)], vertices[arr(self.dst_inds)])
+        except (IndexError, ValueError):
+            src_inds = dst_inds = np.empty(0, dtype=int)
+        edges = np.unique(
+            np.ravel_multi_index((np.concatenate((src_inds, dst_inds)), np.concatenate((dst_inds, src_inds))), shape)
+        )
+        rows, columns = np.divmod(edges, self.vertex_count)
+        adjacency = csr_matrix((np.full(len(edges), self.spread, dtype=float), (rows, columns)), shape=shape)
+        adjacency.eliminate_zeros()
+        return adjacency
+
     def shortest_path_matrix(self):
         """Returns the shortest-path matrix."""
         if not self.src_inds:
@@ -66,15 +91,11 @@ class GraphLayoutGenerator:
             self.src_inds = [self.vertex_count, self.vertex_count]
             self.dst_inds = [np.random.randint(0, self.vertex_count), np.random.randint(0, self.vertex_count)]
             self.vertex_count += 1
-        dist = np.zeros((self.vertex_count, self.vertex_count))
-        src_inds = arr(self.src_inds)
-        dst_inds = arr(self.dst_inds)
-        try:
-            dist[src_inds, dst_inds] = dist[dst_inds, src_inds] = self.spread
-        except IndexError:
-            pass
+        adjacency = self._adjacency_matrix()
+        matrix = np.empty((self.vertex_count, self.vertex_count))
+        infinity_fill = self.spread * self.vertex_count ** (0.5)
+        zero_fill = self.spread * 1e-6
         start = 0
-        slices = []
         iteration = 0
         self.emit_msg("Step 1 of 2: Computing shortest-path matrix...")
         while start < self.vertex_count:
@@ -82,29 +103,31 @@ class GraphLayoutGenerator:
                 return None
             self.emit_progressed(iteration)
             stop = min(self.vertex_count, start + math.ceil(self.vertex_count / 10))
-            slice_ = dijkstra(dist, directed=False, indices=range(start, stop))
-            slices.append(slice_)
+            slice_ = matrix[start:stop]
+            slice_[:] = dijkstra(adjacency, directed=False, indices=range(start, stop))
+            # Remove infinites and zeros while the slice is still hot in cache
+            slice_[slice_ == np.inf] = infinity_fill
+            slice_[slice_ == 0] = zero_fill
             start = stop
             iteration += 1
-        matrix = np.vstack(slices)
-        # Remove infinites and zeros
-        matrix[matrix == np.inf] = self.spread * self.vertex_count ** (0.5)
-        matrix[matrix == 0] = self.spread * 1e-6
         return matrix
 
     def sets(self):
-        """Returns sets of vertex pairs indices."""
+        """Returns sets of vertex pairs indices.
+
+        No vertex appears twice within a set.
+        """
         sets = []
         for n in range(1, self.vertex_count):
-            pairs = np.zeros((self.vertex_count - n, 2), int)  # pairs on diagonal n
+            pairs = np.empty((self.vertex_count - n, 2), dtype=np.int32)  # pairs on diagonal n
             pairs[:, 0] = np.arange(self.vertex_count - n)
             pairs[:, 1] = pairs[:, 0] + n
-            mask = np.mod(range(self.vertex_count - n), 2 * n) < n
+            mask = np.arange(self.vertex_count - n) % (2 * n) < n
             s1 = pairs[mask]
             s2 = pairs[~mask]
-            if s1.any():
+            if len(s1):
                 sets.append(s1)
-            if s2.any():
+            if len(s2):
                 sets.append(s2)
         return sets
 
@@ -117,9 +140,7 @@ class GraphLayoutGenerator:
         matrix = self.shortest_path_matrix()
         if matrix is None:
             return
-        mask = np.ones((self.vertex_count, self.vertex_count)) == 1 - np.tril(
-            np.ones((self.vertex_count, self.vertex_count))
-        )  # Upper triangular except diagonal
+        upper = np.triu_indices(self.vertex_count, k=1)  # Upper triangular except diagonal
         np.random.seed(0)
         layout = np.random.rand(self.vertex_count, 2) * self.initial_diameter - self.initial_diameter / 2
         heavy_ind_list = list()
@@ -132,10 +153,18 @@ class GraphLayoutGenerator:
         if heavy_ind.any():
             layout[heavy_ind, :] = heavy_pos
         weights = matrix ** self.weight_exp  # bus-pair weights (lower for distant buses)
-        maxstep = 1 / np.min(weights[mask])
-        minstep = 1 / np.max(weights[mask])
+        upper_weights = weights[upper]
+        maxstep = 1 / np.min(upper_weights)
+        minstep = 1 / np.max(upper_weights)
+        del upper, upper_weights
         lambda_ = np.log(minstep / maxstep) / (self.max_iters - 1)  # exponential decay of allowed adjustment
         sets = self.sets()  # construct sets of bus pairs
+        # Scratch buffers, sliced to each set's size; vertices within a set are unique so plain scatter is safe
+        max_set_size = max(len(s) for s in sets)
+        delta_buffer = np.empty((max_set_size, 2))
+        dist_buffer = np.empty(max_set_size)
+        factor_buffer = np.empty(max_set_size)
+        square_buffer = np.empty((max_set_size, 2))
         self.emit_msg("Step 2 of 2: Generating layout...")
         for iteration in range(self.max_iters):
             if self._stopped:
@@ -150,14 +179,19 @@ class GraphLayoutGenerator:
                 self.vertex_count
             )  # we don't want to use the same pair order each iteration
             for s in sets:
+                n = len(s)
                 v1, v2 = rand_order[s[:, 0]], rand_order[s[:, 1]]  # arrays of vertex1 and vertex2
+                delta = np.subtract(layout[v1], layout[v2], out=delta_buffer[:n])
                 # current distance (possibly accounting for system rescaling)
-                dist = ((layout[v1, 0] - layout[v2, 0]) ** 2 + (layout[v1, 1] - layout[v2, 1]) ** 2) ** 0.5
-                r = (matrix[v1, v2] - dist)[:, None] * (layout[v1] - layout[v2]) / dist[:, None] / 2  # desired change
-                dx1 = r * np.minimum(1, weights[v1, v2] * step)[:, None]
-                dx2 = -dx1
-                layout[v1, :] += dx1  # update position
-                layout[v2, :] += dx2
+                dist = np.multiply(delta, delta, out=square_buffer[:n]).sum(axis=1, out=dist_buffer[:n])
+                np.sqrt(dist, out=dist)
+                # desired change, scaled by how much of it is allowed
+                delta *= np.subtract(matrix[v1, v2], dist, out=factor_buffer[:n])[:, None]
+                delta /= dist[:, None]
+                delta /= 2
+                delta *= np.minimum(1, weights[v1, v2] * step)[:, None]
+                layout[v1, :] += delta  # update position
+                layout[v2, :] -= delta
                 if heavy_ind.any():
                     layout[heavy_ind, :] = heavy_pos
         x, y = layout[:, 0], layout[:, 1]
@@ -889,30 +889,35 @@ def forward_sweep(root, fn):
 
 
 def get_relationship_entity_class_items(item, object_class_type):
+    # Items are often cache items; dict.get skips their __getitem__ overrides, which don't apply to these keys
+    entity_class_id = dict.get(item, "id")
     return [
         {
-            "entity_class_id": item["id"],
+            "entity_class_id": entity_class_id,
             "dimension": dimension,
             "member_class_id": object_class_id,
             "member_class_type_id": object_class_type,
         }
-        for dimension, object_class_id in enumerate(item["object_class_id_list"])
+        for dimension, object_class_id in enumerate(dict.get(item, "object_class_id_list"))
     ]
 
 
 def get_relationship_entity_items(item, relationship_entity_type, object_entity_type):
+    get = dict.get
+    entity_id = get(item, "id")
+    entity_class_id = get(item, "class_id")
     return [
         {
-            "entity_id": item["id"],
+            "entity_id": entity_id,
             "type_id": relationship_entity_type,
-            "entity_class_id": item["class_id"],
+            "entity_class_id": entity_class_id,
             "dimension": dimension,
             "member_id": object_id,
             "member_class_type_id": object_entity_type,
             "member_class_id": object_class_id,
         }
         for dimension, (object_id, object_class_id) in enumerate(
-            zip(item["object_id_list"], item["object_class_id_list"])
+            zip(get(item, "object_id_list"), get(item, "object_class_id_list"))
         )
     ]
 
@@ -75,6 +75,7 @@ class Mapping:
             filter_re (str): regular expression for filtering
         """
         self._child = None
+        self._flattened = None
         self._value = None
         self._unfixed_value_data = self._data
         self._filter_re = None
@@ -92,6 +93,10 @@ class Mapping:
         self._child = child
         if isinstance(child, Mapping):
             child.parent = self
+        mapping = self
+        while mapping is not None:
+            mapping._flattened = None
+            mapping = mapping.parent
 
     @property
     def value(self):
@@ -159,7 +164,14 @@ class Mapping:
         Returns:
             list of Mapping: mappings in parent-child-grand child-etc order
         """
-        return [self] + (self.child.flatten() if self.child is not None else [])
+        if self._flattened is None:
+            flattened = []
+            mapping = self
+            while mapping is not None:
+                flattened.append(mapping)
+                mapping = mapping.child
+            self._flattened = tuple(flattened)
+        return list(self._flattened)
 
     def is_pivoted(self):
         """
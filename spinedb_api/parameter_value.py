@@ -50,6 +50,12 @@ _TIME_SERIES_DEFAULT_START = "0001-01-01T00:00:00"
 _TIME_SERIES_DEFAULT_RESOLUTION = "1h"
 # Default unit if resolution is given as a number instead of a string.
 _TIME_SERIES_PLAIN_INDEX_UNIT = "m"
+# Database values that are plain JSON numbers.
+_JSON_NUMBER = re.compile(rb"-?(0|[1-9]\d*)(\.\d+)?([eE][+-]?\d+)?")
+# Bytes within a JSON string that need the JSON parser: quotes, escapes and control characters.
+_JSON_STRING_SPECIAL_BYTE = re.compile(rb'["\\\x00-\x1f]')
+# Database values of JSON literals and their Python counterparts.
+_JSON_LITERALS = {b"null": None, b"true": True, b"false": False}
 
 
 def duration_to_relativedelta(duration):
@@ -174,6 +180,19 @@ def from_database(database_value, value_type=None):
     Returns:
         Any: the encoded parameter value
     """
+    if isinstance(database_value, bytes) and database_value:
+        # Plain numbers, literals and strings don't need the JSON parser.
+        if _JSON_NUMBER.fullmatch(database_value):
+            return float(database_value)
+        if database_value in _JSON_LITERALS:
+            return _JSON_LITERALS[database_value]
+        if len(database_value) > 1 and database_value.startswith(b'"') and database_value.endswith(b'"'):
+            string_bytes = database_value[1:-1]
+            if _JSON_STRING_SPECIAL_BYTE.search(string_bytes) is None:
+                try:
+                    return string_bytes.decode("utf-8")
+                except UnicodeDecodeError:
+                    pass
     parsed = load_db_value(database_value, value_type)
     if isinstance(parsed, dict):
         return from_dict(parsed)
@@ -663,6 +663,46 @@ class TestExportMapping(unittest.TestCase):
         )
         db_map.connection.close()
 
+    def test_rows_with_table_name_and_hidden_positions(self):
+        db_map = DiffDatabaseMapping("sqlite://", create=True)
+        import_object_classes(db_map, ("oc1", "oc2"))
+        import_objects(db_map, (("oc1", "o11"), ("oc1", "o12"), ("oc2", "o21")))
+        import_object_parameters(db_map, (("oc1", "p1"), ("oc2", "p2")))
+        import_object_parameter_values(
+            db_map,
+            (
+                ("oc1", "o11", "p1", Map(["a", "b"], [-1.1, 2.3])),
+                ("oc1", "o12", "p1", Map(["a"], [5.0])),
+                ("oc2", "o21", "p2", Map(["c"], [7.0])),
+            ),
+        )
+        db_map.commit_session("Add test data.")
+        mapping = unflatten(
+            [
+                ObjectClassMapping(Position.table_name),
+                ParameterDefinitionMapping(Position.hidden),
+                ObjectMapping(0),
+                AlternativeMapping(Position.hidden),
+                ParameterValueIndexMapping(1),
+                ExpandedParameterValueMapping(2),
+            ]
+        )
+        tables = dict()
+        for title, title_key in titles(mapping, db_map):
+            tables[title] = list(mapping.rows(db_map, title_key))
+        self.assertEqual(
+            tables,
+            {
+                "oc1": [
+                    {Position.hidden: "Base", 0: "o11", 1: "a", 2: -1.1},
+                    {Position.hidden: "Base", 0: "o11", 1: "b", 2: 2.3},
+                    {Position.hidden: "Base", 0: "o12", 1: "a", 2: 5.0},
+                ],
+                "oc2": [{Position.hidden: "Base", 0: "o21", 1: "c", 2: 7.0}],
+            },
+        )
+        db_map.connection.close()
+
     def test_parameter_definitions_with_value_lists(self):
         db_map = DiffDatabaseMapping("sqlite://", create=True)
         import_object_classes(db_map, ("oc",))
@@ -15,6 +15,8 @@ Unit tests for DatabaseMapping class.
 :author: A. Soininen
 :date:   2.7.2020
 """
+import os.path
+from tempfile import TemporaryDirectory
 import unittest
 from unittest.mock import patch
 from sqlalchemy.engine.url import URL
@@ -553,6 +555,22 @@ class TestDatabaseMappingBaseQueries(unittest.TestCase):
         self.assertEqual(value_lists[1].name, "list2")
 
 
+class TestDatabaseMappingAddMixin(unittest.TestCase):
+    def setUp(self):
+        self._db_map = DatabaseMapping(IN_MEMORY_DB_URL, create=True)
+
+    def tearDown(self):
+        self._db_map.connection.close()
+
+    def test_add_single_items_without_auto_flush(self):
+        self._db_map.auto_flush = False
+        object_class = self._db_map.add_object_class(name="fish")
+        self.assertEqual(object_class.name, "fish")
+        object_ = self._db_map.add_object(name="nemo", class_id=object_class.id)
+        self.assertEqual(object_.name, "nemo")
+        self.assertEqual(object_.class_id, object_class.id)
+
+
 class TestDatabaseMappingUpdateMixin(unittest.TestCase):
     def setUp(self):
         self._db_map = DatabaseMapping(IN_MEMORY_DB_URL, create=True)
@@ -909,6 +927,16 @@ class TestDatabaseMappingUpdateMixin(unittest.TestCase):
             metadata_records[0]._asdict(), {"id": 1, "name": "author", "value": "Prof. T. Est", "commit_id": 3}
         )
 
+    def test_update_buffered_item_without_auto_flush(self):
+        self._db_map.auto_flush = False
+        ids, _ = self._db_map.add_object_classes({"name": "fish"})
+        class_id = next(iter(ids))
+        updated_ids, errors = self._db_map.update_object_classes({"id": class_id, "name": "octopus"})
+        self.assertEqual(errors, [])
+        self.assertEqual(updated_ids, {class_id})
+        self._db_map.commit_session("Add test data.")
+        self.assertEqual([x.name for x in self._db_map.query(self._db_map.object_class_sq)], ["octopus"])
+
 
 class TestDatabaseMappingRemoveMixin(unittest.TestCase):
     def setUp(self):
@@ -1011,6 +1039,38 @@ class TestDatabaseMappingCommitMixin(unittest.TestCase):
     def test_commit_session_raise_when_nothing_to_commit(self):
         self.assertRaisesRegex(SpineDBAPIError, "Nothing to commit.", self._db_map.commit_session, "No changes.")
 
+    def test_commit_in_bulk_import_mode(self):
+        with TemporaryDirectory() as temp_dir:
+            url = URL("sqlite", database=os.path.join(temp_dir, "test_commit_in_bulk_import_mode.sqlite"))
+            db_map = DatabaseMapping(url, create=True)
+            try:
+                with db_map.bulk_import_mode():
+                    self.assertEqual(db_map.connection.execute("PRAGMA journal_mode").scalar(), "wal")
+                    self.assertEqual(db_map.connection.execute("PRAGMA synchronous").scalar(), 1)
+                    import_functions.import_object_classes(db_map, ("my_class",))
+                    db_map.commit_session("Add object class.")
+                self.assertEqual(db_map.connection.execute("PRAGMA journal_mode").scalar(), "delete")
+                self.assertEqual(db_map.connection.execute("PRAGMA synchronous").scalar(), 2)
+                self.assertEqual([x.name for x in db_map.query(db_map.object_class_sq)], ["my_class"])
+            finally:
+                db_map.connection.close()
+
+    def test_reconnect_keeps_bulk_import_mode(self):
+        with TemporaryDirectory() as temp_dir:
+            url = URL("sqlite", database=os.path.join(temp_dir, "test_reconnect_keeps_bulk_import_mode.sqlite"))
+            db_map = DatabaseMapping(url, create=True)
+            try:
+                with db_map.bulk_import_mode():
+                    db_map.connection.close()
+                    db_map.reconnect()
+                    self.assertEqual(db_map.connection.execute("PRAGMA synchronous").scalar(), 1)
+                    self.assertEqual(db_map.connection.execute("PRAGMA temp_store").scalar(), 2)
+                db_map.connection.close()
+                db_map.reconnect()
+                self.assertEqual(db_map.connection.execute("PRAGMA synchronous").scalar(), 2)
+            finally:
+                db_map.connection.close()
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -21,6 +21,7 @@ from tempfile import TemporaryDirectory
 import unittest
 from unittest import mock
 from sqlalchemy.engine.url import make_url, URL
+from sqlalchemy.exc import DBAPIError
 from sqlalchemy.util import KeyedTuple
 from spinedb_api.diff_db_mapping import DiffDatabaseMapping
 from spinedb_api.exception import SpineIntegrityError
@@ -425,6 +426,101 @@ class TestDiffDatabaseMappingAdd(unittest.TestCase):
         self._db_map.commit_session("test_commit")
         self.assertEqual(self._db_map.query(self._db_map.entity_sq).count(), 1001)
 
+    def test_staged_adds(self):
+        with self._db_map.staged_adds():
+            ids, _ = self._db_map.add_object_classes({"name": "fish"})
+            class_id = next(iter(ids))
+            self._db_map.add_objects({"name": "nemo", "class_id": class_id}, {"name": "dory", "class_id": class_id})
+        self.assertEqual(self._db_map.query(self._db_map.object_sq).count(), 2)
+        self._db_map.commit_session("Add test data.")
+        self.assertEqual({x.name for x in self._db_map.query(self._db_map.object_sq)}, {"nemo", "dory"})
+
+    def test_staged_adds_uses_single_transaction(self):
+        with mock.patch.object(self._db_map.connection, "begin", wraps=self._db_map.connection.begin) as begin:
+            with self._db_map.staged_adds():
+                ids, _ = self._db_map.add_object_classes({"name": "fish"})
+                class_id = next(iter(ids))
+                self._db_map.add_objects({"name": "nemo", "class_id": class_id}, {"name": "dory", "class_id": class_id})
+            begin.assert_called_once_with()
+        self.assertEqual(self._db_map.query(self._db_map.object_sq).count(), 2)
+
+    def test_staged_adds_rolls_back_when_body_raises(self):
+        self._db_map.add_object_classes({"name": "fish"})
+        with self.assertRaises(RuntimeError):
+            with self._db_map.staged_adds():
+                self._db_map.add_object_classes({"name": "dog"})
+                raise RuntimeError("failure")
+        self.assertEqual({x.name for x in self._db_map.query(self._db_map.object_class_sq)}, {"fish"})
+        self._db_map.commit_session("Add test data.")
+        self.assertEqual({x.name for x in self._db_map.query(self._db_map.object_class_sq)}, {"fish"})
+
+    def test_add_without_auto_flush_inserts_on_commit(self):
+        self._db_map.auto_flush = False
+        ids, errors = self._db_map.add_object_classes({"name": "fish"}, {"name": "dog"})
+        self.assertEqual(errors, [])
+        self.assertEqual(len(ids), 2)
+        diff_table = self._db_map._diff_table("entity_class")
+        self.assertEqual(self._db_map.query(diff_table).count(), 0)
+        self._db_map.commit_session("Add test data.")
+        self.assertEqual({x.name for x in self._db_map.query(self._db_map.object_class_sq)}, {"fish", "dog"})
+
+    def test_flush_pending_inserts_referenced_tables_first(self):
+        ids, _ = self._db_map.add_object_classes({"name": "fish"})
+        fish_id = next(iter(ids))
+        self._db_map.auto_flush = False
+        self._db_map.add_items("object", {"name": "nemo", "class_id": fish_id}, check=False)
+        self._db_map.add_items("object_class", {"name": "dog"}, check=False)
+        with mock.patch.object(self._db_map, "_insert_rows", wraps=self._db_map._insert_rows) as insert_rows:
+            self._db_map.flush_pending()
+        flushed_tables = [call.args[0].name for call in insert_rows.call_args_list]
+        diff_prefix = self._db_map.diff_prefix
+        self.assertLess(
+            flushed_tables.index(diff_prefix + "entity_class"), flushed_tables.index(diff_prefix + "entity")
+        )
+        self.assertEqual({x.name for x in self._db_map.query(self._db_map.object_class_sq)}, {"fish", "dog"})
+        self.assertEqual({x.name for x in self._db_map.query(self._db_map.object_sq)}, {"nemo"})
+
+    def test_add_without_auto_flush_checks_against_buffered_items(self):
+        self._db_map.auto_flush = False
+        ids, errors = self._db_map.add_object_classes({"name": "fish"})
+        self.assertEqual(errors, [])
+        class_id = next(iter(ids))
+        ids, errors = self._db_map.add_objects({"name": "nemo", "class_id": class_id})
+        self.assertEqual(errors, [])
+        self.assertEqual(len(ids), 1)
+        _, errors = self._db_map.add_object_classes({"name": "fish"})
+        self.assertEqual(len(errors), 1)
+        self._db_map.commit_session("Add test data.")
+        self.assertEqual({x.name for x in self._db_map.query(self._db_map.object_sq)}, {"nemo"})
+
+    def test_update_buffered_item_without_auto_flush(self):
+        self._db_map.auto_flush = False
+        ids, _ = self._db_map.add_object_classes({"name": "fish"})
+        class_id = next(iter(ids))
+        ids, errors = self._db_map.update_object_classes({"id": class_id, "name": "octopus"})
+        self.assertEqual(errors, [])
+        self.assertEqual(ids, {class_id})
+        self._db_map.commit_session("Add test data.")
+        self.assertEqual([x.name for x in self._db_map.query(self._db_map.object_class_sq)], ["octopus"])
+
+    def test_remove_buffered_item_without_auto_flush(self):
+        self._db_map.auto_flush = False
+        ids, _ = self._db_map.add_object_classes({"name": "fish"}, {"name": "dog"})
+        self._db_map.remove_items(object_class={min(ids)})
+        self._db_map.commit_session("Add test data.")
+        self.assertEqual([x.name for x in self._db_map.query(self._db_map.object_class_sq)], ["dog"])
+
+    def test_failed_flush_keeps_pending_inserts(self):
+        self._db_map.auto_flush = False
+        self._db_map.add_object_classes({"name": "fish"}, {"name": "dog"})
+        error = DBAPIError("INSERT", {}, Exception("disk full"))
+        with mock.patch.object(self._db_map, "_insert_rows", side_effect=error):
+            with self.assertRaises(SpineDBAPIError):
+                self._db_map.flush_pending()
+        self.assertEqual(set(self._db_map._pending_inserts), {"entity_class", "object_class"})
+        self._db_map.commit_session("Add test data.")
+        self.assertEqual({x.name for x in self._db_map.query(self._db_map.object_class_sq)}, {"fish", "dog"})
+
     def test_add_object_classes(self):
         """Test that adding object classes works."""
         self._db_map.add_object_classes({"name": "fish"}, {"name": "dog"})
@@ -933,6 +1029,55 @@ class TestDiffDatabaseMappingAdd(unittest.TestCase):
             alternatives[1]._asdict(), {"id": 2, "name": "my_alternative", "description": None, "commit_id": None}
         )
 
+    def test_add_alternatives_with_known_ids_keeps_them(self):
+        ids, errors = self._db_map.add_alternatives({"name": "alt_5", "id": 5}, {"name": "alt_7", "id": 7})
+        self.assertEqual(errors, [])
+        self.assertEqual(ids, {5, 7})
+        alternatives = self._db_map.query(self._db_map.alternative_sq).all()
+        self.assertEqual([(x.id, x.name) for x in alternatives], [(1, "Base"), (5, "alt_5"), (7, "alt_7")])
+
+    def test_add_alternatives_without_ids_after_known_ids(self):
+        ids, errors = self._db_map.add_alternatives({"name": "alt_5", "id": 5}, {"name": "alt_7", "id": 7})
+        self.assertEqual(errors, [])
+        self.assertEqual(ids, {5, 7})
+        ids, errors = self._db_map.add_alternatives({"name": "alt_8"}, {"name": "alt_9"})
+        self.assertEqual(errors, [])
+        self.assertEqual(ids, {8, 9})
+        self._db_map.commit_session("Add test data.")
+        alternatives = self._db_map.query(self._db_map.alternative_sq).all()
+        self.assertEqual(
+            [(x.id, x.name) for x in alternatives],
+            [(1, "Base"), (5, "alt_5"), (7, "alt_7"), (8, "alt_8"), (9, "alt_9")],
+        )
+
+    def test_add_alternatives_with_and_without_ids_in_same_batch(self):
+        ids, errors = self._db_map.add_alternatives({"name": "alt_5", "id": 5}, {"name": "alt_x"})
+        self.assertEqual(errors, [])
+        self.assertEqual(ids, {5, 6})
+        self._db_map.commit_session("Add test data.")
+        alternatives = self._db_map.query(self._db_map.alternative_sq).all()
+        self.assertEqual([(x.id, x.name) for x in alternatives], [(1, "Base"), (5, "alt_5"), (6, "alt_x")])
+
+    def test_add_alternatives_with_taken_id_raises(self):
+        with self.assertRaises(SpineIntegrityError):
+            self._db_map.add_alternatives({"name": "alt_1", "id": 1})
+        self._db_map.add_alternatives({"name": "alt_5", "id": 5})
+        with self.assertRaises(SpineIntegrityError):
+            self._db_map.add_alternatives({"name": "other_alt_5", "id": 5})
+        alternatives = self._db_map.query(self._db_map.alternative_sq).all()
+        self.assertEqual([(x.id, x.name) for x in alternatives], [(1, "Base"), (5, "alt_5")])
+
+    def test_add_alternatives_with_known_ids_below_next_id_skips_reservation(self):
+        self._db_map.add_alternatives({"name": "alt_10", "id": 10})
+        with mock.patch.object(self._db_map, "_do_reserve_ids", wraps=self._db_map._do_reserve_ids) as reserve_ids:
+            ids, errors = self._db_map.add_alternatives({"name": "alt_7", "id": 7})
+            self.assertEqual(errors, [])
+            self.assertEqual(ids, {7})
+            reserve_ids.assert_not_called()
+        ids, errors = self._db_map.add_alternatives({"name": "alt_11"})
+        self.assertEqual(errors, [])
+        self.assertEqual(ids, {11})
+
     def test_add_scenario(self):
         ids, errors = self._db_map.add_scenarios({"name": "my_scenario"})
         self.assertEqual(errors, [])
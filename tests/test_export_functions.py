@@ -17,6 +17,7 @@ Unit tests for export_functions.
 """
 
 import unittest
+from unittest import mock
 from spinedb_api import (
     DiffDatabaseMapping,
     export_alternatives,
@@ -116,6 +117,21 @@ class TestExportFunctions(unittest.TestCase):
             set(exported), {("scenario", "alternative2", "alternative1"), ("scenario", "alternative1", None)}
         )
 
+    def test_export_scenario_alternatives_by_id_keeps_before_alternative(self):
+        import_alternatives(self._db_map, ["alternative1", "alternative2", "alternative3"])
+        import_scenarios(self._db_map, ["scenario"])
+        import_scenario_alternatives(self._db_map, (("scenario", "alternative1"),))
+        import_scenario_alternatives(self._db_map, (("scenario", "alternative2"),))
+        import_scenario_alternatives(self._db_map, (("scenario", "alternative3"),))
+        scenario_alternative_id = (
+            self._db_map.query(self._db_map.scenario_alternative_sq)
+            .filter(self._db_map.scenario_alternative_sq.c.rank == 2)
+            .one()
+            .id
+        )
+        exported = export_scenario_alternatives(self._db_map, {scenario_alternative_id})
+        self.assertEqual(exported, [("scenario", "alternative2", "alternative3")])
+
     def test_export_data(self):
         import_object_classes(self._db_map, ["object_class"])
         import_object_parameters(self._db_map, [("object_class", "object_parameter")])
@@ -165,6 +181,15 @@ class TestExportFunctions(unittest.TestCase):
         self.assertIn("scenario_alternatives", exported)
         self.assertEqual(exported["scenario_alternatives"], [("scenario", "alternative", None)])
 
+    def test_export_data_makes_cache_once(self):
+        import_object_classes(self._db_map, ["object_class"])
+        import_objects(self._db_map, [("object_class", "object")])
+        with mock.patch.object(self._db_map, "make_cache", wraps=self._db_map.make_cache) as make_cache:
+            exported = export_data(self._db_map)
+        make_cache.assert_called_once()
+        self.assertEqual(exported["object_classes"], [("object_class", None, None)])
+        self.assertEqual(exported["objects"], [("object_class", "object", None)])
+
 
 if __name__ == '__main__':
     unittest.main()
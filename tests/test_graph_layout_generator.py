@@ -0,0 +1,155 @@
+######################################################################################################################
+# Copyright (C) 2017-2022 Spine project consortium
+# This file is part of Spine Database API.
+# Spine Database API is free software: you can redistribute it and/or modify it under the terms of the GNU Lesser
+# General Public License as published by the Free Software Foundation, either version 3 of the License, or (at your
+# option) any later version. This program is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY;
+# without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU Lesser General
+# Public License for more details. You should have received a copy of the GNU Lesser General Public License along with
+# this program. If not, see <http://www.gnu.org/licenses/>.
+######################################################################################################################
+
+"""
+Unit tests for graph_layout_generator.py.
+"""
+
+import unittest
+import numpy as np
+from numpy import atleast_1d as arr
+from numpy.testing import assert_allclose
+from scipy.sparse.csgraph import dijkstra
+from spinedb_api.graph_layout_generator import GraphLayoutGenerator
+
+
+def _dense_shortest_path_matrix(vertex_count, src_inds, dst_inds, spread):
+    """Computes the shortest-path matrix from a dense distance matrix."""
+    dist = np.zeros((vertex_count, vertex_count))
+    try:
+        dist[arr(src_inds), arr(dst_inds)] = dist[arr(dst_inds), arr(src_inds)] = spread
+    except IndexError:
+        pass
+    matrix = dijkstra(dist, directed=False)
+    matrix[matrix == np.inf] = spread * vertex_count ** (0.5)
+    matrix[matrix == 0] = spread * 1e-6
+    return matrix
+
+
+def _dense_layout(matrix, initial_diameter, max_iters, weight_exp, sets):
+    """Computes the layout with the unbuffered VSGD-MS update."""
+    vertex_count = len(matrix)
+    np.random.seed(0)
+    layout = np.random.rand(vertex_count, 2) * initial_diameter - initial_diameter / 2
+    weights = matrix**weight_exp
+    mask = np.ones((vertex_count, vertex_count)) == 1 - np.tril(np.ones((vertex_count, vertex_count)))
+    maxstep = 1 / np.min(weights[mask])
+    minstep = 1 / np.max(weights[mask])
+    lambda_ = np.log(minstep / maxstep) / (max_iters - 1)
+    for iteration in range(max_iters):
+        step = maxstep * np.exp(lambda_ * iteration)
+        rand_order = np.random.permutation(vertex_count)
+        for s in sets:
+            v1, v2 = rand_order[s[:, 0]], rand_order[s[:, 1]]
+            dist = ((layout[v1, 0] - layout[v2, 0]) ** 2 + (layout[v1, 1] - layout[v2, 1]) ** 2) ** 0.5
+            r = (matrix[v1, v2] - dist)[:, None] * (layout[v1] - layout[v2]) / dist[:, None] / 2
+            dx1 = r * np.minimum(1, weights[v1, v2] * step)[:, None]
+            layout[v1, :] += dx1
+            layout[v2, :] -= dx1
+    return layout[:, 0], layout[:, 1]
+
+
+class TestGraphLayoutGenerator(unittest.TestCase):
+    def _assert_shortest_paths_match_dense(self, vertex_count, src_inds, dst_inds, spread=3.0):
+        generator = GraphLayoutGenerator(vertex_count, src_inds, dst_inds, spread=spread)
+        matrix = generator.shortest_path_matrix()
+        expected = _dense_shortest_path_matrix(
+            generator.vertex_count, generator.src_inds, generator.dst_inds, generator.spread
+        )
+        assert_allclose(matrix, expected)
+        return matrix
+
+    def test_shortest_path_matrix(self):
+        matrix = self._assert_shortest_paths_match_dense(5, [0, 1, 2], [1, 2, 0])
+        self.assertAlmostEqual(matrix[0, 1], 3.0)
+        self.assertAlmostEqual(matrix[3, 4], 3.0 * 5**0.5, places=5)
+
+    def test_shortest_path_matrix_with_duplicate_edges(self):
+        matrix = self._assert_shortest_paths_match_dense(4, [0, 1, 0, 1, 2], [1, 0, 1, 2, 3])
+        self.assertAlmostEqual(matrix[0, 1], 3.0)
+        self.assertAlmostEqual(matrix[0, 3], 9.0)
+
+    def test_negative_indices_count_from_last_vertex(self):
+        matrix = self._assert_shortest_paths_match_dense(4, [0, -1], [1, 2])
+        self.assertAlmostEqual(matrix[2, 3], 3.0)
+
+    def test_index_out_of_range_leaves_graph_without_edges(self):
+        matrix = self._assert_shortest_paths_match_dense(4, [0, 1], [1, 4])
+        self.assertTrue(np.all(matrix[~np.eye(4, dtype=bool)] == 3.0 * 2.0))
+
+    def test_mismatched_index_lists_leave_graph_without_edges(self):
+        matrix = self._assert_shortest_paths_match_dense(4, [0, 1, 2], [1, 2])
+        self.assertTrue(np.all(matrix[~np.eye(4, dtype=bool)] == 3.0 * 2.0))
+
+    def test_single_source_index_is_broadcast(self):
+        matrix = self._assert_shortest_paths_match_dense(4, [0], [1, 2, 3])
+        self.assertAlmostEqual(matrix[1, 3], 6.0)
+
+    def test_edgeless_graph_gets_fake_vertex(self):
+        np.random.seed(23)
+        generator = GraphLayoutGenerator(3, spread=2.0)
+        matrix = generator.shortest_path_matrix()
+        self.assertEqual(generator.vertex_count, 4)
+        self.assertEqual(generator.src_inds, [3, 3])
+        expected = _dense_shortest_path_matrix(4, generator.src_inds, generator.dst_inds, 2.0)
+        assert_allclose(matrix, expected)
+
+    def test_compute_layout(self):
+        generator = GraphLayoutGenerator(5, [0, 1, 2, 2], [1, 2, 0, 3], spread=10)
+        generator.compute_layout()
+        assert_allclose(
+            generator.x,
+            [1.3591615939725907, -8.07951776780955, -2.0154297514662862, 0.4071737189136389, 18.98306582533464],
+        )
+        assert_allclose(
+            generator.y,
+            [-4.733968754756667, -2.654674802678117, 5.259082959797594, 15.033983798097118, 2.3272510799767043],
+        )
+
+    def test_compute_layout_keeps_heavy_positions(self):
+        generator = GraphLayoutGenerator(
+            5, [0, 1, 2, 2], [1, 2, 0, 3], spread=10, heavy_positions={4: {"x": 1.0, "y": -2.0}}
+        )
+        generator.compute_layout()
+        assert_allclose(
+            generator.x, [15.333225924148302, 12.614880997128324, 5.507588726330867, -4.498477986015808, 1.0]
+        )
+        assert_allclose(
+            generator.y, [18.691135859110748, 9.527954716270926, 16.808959275712766, 19.21101784146044, -2.0]
+        )
+
+    def test_compute_layout_of_larger_graph_matches_unbuffered_update(self):
+        vertex_count = 60
+        src_inds = list(range(vertex_count)) + [0, 10, 20]
+        dst_inds = [(i + 1) % vertex_count for i in range(vertex_count)] + [30, 40, 50]
+        generator = GraphLayoutGenerator(vertex_count, src_inds, dst_inds, spread=10)
+        generator.compute_layout()
+        x, y = _dense_layout(
+            _dense_shortest_path_matrix(vertex_count, src_inds, dst_inds, 10),
+            generator.initial_diameter,
+            generator.max_iters,
+            generator.weight_exp,
+            generator.sets(),
+        )
+        assert_allclose(generator.x, x, rtol=1e-12)
+        assert_allclose(generator.y, y, rtol=1e-12)
+
+    def test_sets_cover_every_vertex_pair_once(self):
+        generator = GraphLayoutGenerator(7)
+        pairs = []
+        for s in generator.sets():
+            self.assertEqual(len(np.unique(s)), s.size)
+            pairs += [tuple(pair) for pair in s]
+        self.assertEqual(sorted(pairs), [(i, j) for i in range(7) for j in range(i + 1, 7)])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -32,6 +32,17 @@ class TestMapping(unittest.TestCase):
         mapping.position = 0
         self.assertEqual(value_index(mapping.flatten()), 0)
 
+    def test_flatten_follows_child_changes(self):
+        root_mapping = unflatten([Mapping(0), Mapping(1)])
+        middle = root_mapping.child
+        self.assertEqual(root_mapping.flatten(), [root_mapping, middle])
+        tail = Mapping(2)
+        middle.child = tail
+        self.assertEqual(root_mapping.flatten(), [root_mapping, middle, tail])
+        self.assertEqual(middle.flatten(), [middle, tail])
+        root_mapping.child = tail
+        self.assertEqual(root_mapping.flatten(), [root_mapping, tail])
+
     def test_non_pivoted_columns(self):
         root_mapping = unflatten([Mapping(5), Mapping(Position.hidden)])
         self.assertEqual(root_mapping.non_pivoted_columns(), [5])
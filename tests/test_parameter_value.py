@@ -23,6 +23,7 @@ import dateutil.parser
 from dateutil.relativedelta import relativedelta
 import numpy as np
 import numpy.testing
+from spinedb_api.exception import ParameterValueFormatError
 from spinedb_api.parameter_value import (
     convert_containers_to_maps,
     convert_leaf_maps_to_specialized_containers,
@@ -155,6 +156,30 @@ class TestParameterValue(unittest.TestCase):
         self.assertTrue(isinstance(value, bool))
         self.assertEqual(value, True)
 
+    def test_from_database_null(self):
+        self.assertIsNone(from_database(b"null", value_type=None))
+
+    def test_from_database_plain_string(self):
+        self.assertEqual(from_database(b'"a string"', value_type=None), "a string")
+
+    def test_from_database_escaped_string(self):
+        self.assertEqual(from_database(b'"a \\"quoted\\" string"', value_type=None), 'a "quoted" string')
+
+    def test_from_database_negative_infinity(self):
+        self.assertEqual(from_database(b"-Infinity", value_type=None), float("-inf"))
+
+    def test_from_database_raises_on_numbers_that_are_not_json(self):
+        for database_value in (b"1_0", b"-nan", b"-inf"):
+            with self.subTest(database_value=database_value):
+                with self.assertRaises(ParameterValueFormatError):
+                    from_database(database_value, value_type=None)
+
+    def test_from_database_raises_on_strings_that_are_not_json(self):
+        for database_value in (b'"a","b"', b'"raw\tcontrol character"'):
+            with self.subTest(database_value=database_value):
+                with self.assertRaises(ParameterValueFormatError):
+                    from_database(database_value, value_type=None)
+
     def test_to_database_plain_number(self):
         value = 23.0
         database_value, value_type = to_database(value)